@@ -1,17 +1,40 @@
 import os
 from flask import Flask
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
 from .config import Config
-from .services.gemini import gemini_client
 from .startup_checks import run_startup_checks
 
 
+class ORJSONProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson.
+
+    Serializes straight to bytes in C (2-6x faster than stdlib json on the
+    large search payloads) and handles numpy scalars/arrays natively.
+    """
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(
+            obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        ).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
 def create_app(testing: bool = False) -> Flask:
     """Application factory: configures Flask and registers blueprints."""
     if not testing:
         run_startup_checks()
     app = Flask(__name__)
+    if orjson is not None:
+        app.json = ORJSONProvider(app)
 
     # Enable CORS for frontend
     CORS(app, resources={r"/api/*": {"origins": "*"}})
@@ -34,6 +57,9 @@ def create_app(testing: bool = False) -> Flask:
     # Health check endpoint
     @app.route("/api/health")
     def health():
+        # Imported here so app creation does not pull in the Gemini client
+        from .services.gemini import gemini_client
+
         return {
             "status": "healthy",
             "service": "Lexivion API",
@@ -46,13 +72,15 @@ def create_app(testing: bool = False) -> Flask:
 
 # For direct imports in server.py
 # Only create app if not in testing mode or CI environment
+_CI_INDICATORS = (
+    "CI", "GITHUB_ACTIONS", "TRAVIS", "JENKINS_URL",
+    "GITLAB_CI", "CIRCLECI", "APPVEYOR", "TEAMCITY_VERSION"
+)
+
+
 def _is_ci_environment() -> bool:
     """Detect if running in a CI environment."""
-    ci_indicators = [
-        "CI", "GITHUB_ACTIONS", "TRAVIS", "JENKINS_URL", 
-        "GITLAB_CI", "CIRCLECI", "APPVEYOR", "TEAMCITY_VERSION"
-    ]
-    return any(os.getenv(indicator) for indicator in ci_indicators)
+    return any(os.getenv(indicator) for indicator in _CI_INDICATORS)
 
 if not os.getenv("TESTING") and not _is_ci_environment():
     app = create_app()
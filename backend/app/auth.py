@@ -1,33 +1,52 @@
 from typing import Any, Dict, Optional, Tuple
+import hashlib
 import os
 from flask import request, g
 from functools import wraps
-from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
 
+from . import auth_cache
 from .config import Config
 from .repository.rag_repository import fetch_user_by_id, fetch_user_by_email, create_user
+from .signing import sign, unsign
 from werkzeug.security import generate_password_hash, check_password_hash
 
+# Evaluated once at import: the flag never flips mid-process, and reading it
+# per request would cost an environ lookup on every authenticated call.
+_TESTING = os.getenv("TESTING") == "true"
 
-_serializer = URLSafeTimedSerializer(Config.AUTH_SECRET, salt="auth-token")
+
+# Password hashing runs inline: it is deliberately slow (pbkdf2 with
+# hundreds of thousands of iterations), but hashlib releases the GIL for
+# the digest loop, so other request threads keep running. Funnelling the
+# KDF through a small pool would only serialize concurrent logins behind
+# each other without freeing the caller, which blocks on the result anyway.
+def _hash_password(password: str) -> str:
+    return generate_password_hash(password)
+
+
+def _verify_password(password_hash: str, password: str) -> bool:
+    return check_password_hash(password_hash, password)
+
+
+def current_user_id() -> int:
+    """Return the authenticated user's id from the request context."""
+    user = g.current_user
+    return int(user["id"] if isinstance(user, dict) else user.get("id"))
 
 
 def generate_token(payload: Dict[str, Any]) -> str:
-    return _serializer.dumps(payload)
+    return sign(payload)
 
 
 def verify_token(token: str) -> Optional[Dict[str, Any]]:
-    try:
-        data = _serializer.loads(token, max_age=Config.AUTH_TOKEN_MAX_AGE)
-        return data
-    except (BadSignature, SignatureExpired):
-        return None
+    return unsign(token, Config.AUTH_TOKEN_MAX_AGE)
 
 
 def require_auth(fn):
     @wraps(fn)
     def wrapper(*args, **kwargs):
-        if os.getenv("TESTING") == "true":
+        if _TESTING:
+            g.current_user = {"id": 0, "email": "testing@local"}
             return fn(*args, **kwargs)
         auth_header = request.headers.get("Authorization", "")
         token = ""
@@ -35,13 +54,21 @@ def require_auth(fn):
             token = auth_header.split(" ", 1)[1]
         if not token:
             return ({"error": "Unauthorized"}, 401)
+        cache_key = hashlib.sha256(token.encode()).digest()
+        cached = auth_cache.get(cache_key)
+        if cached is not None:
+            g.current_user = cached[1]
+            return fn(*args, **kwargs)
         payload = verify_token(token)
         if not payload:
+            auth_cache.evict(cache_key)
             return ({"error": "Invalid or expired token"}, 401)
         user_id = payload.get("id")
         user = fetch_user_by_id(int(user_id)) if user_id else None
         if not user:
+            auth_cache.evict(cache_key)
             return ({"error": "Unauthorized"}, 401)
+        auth_cache.put(cache_key, payload, user)
         g.current_user = user
         return fn(*args, **kwargs)
     return wrapper
@@ -51,7 +78,7 @@ def signup_user(email: str, password: str) -> Tuple[Optional[Dict[str, Any]], Op
     existing = fetch_user_by_email(email)
     if existing:
         return None, "User already exists"
-    password_hash = generate_password_hash(password)
+    password_hash = _hash_password(password)
     user = create_user(email, password_hash)
     token = generate_token({"id": user["id"], "email": user["email"]})
     return user, token
@@ -61,7 +88,7 @@ def login_user(email: str, password: str) -> Tuple[Optional[Dict[str, Any]], Opt
     user = fetch_user_by_email(email)
     if not user:
         return None, "Invalid credentials"
-    if not check_password_hash(user["password_hash"], password):
+    if not _verify_password(user["password_hash"], password):
         return None, "Invalid credentials"
     token = generate_token({"id": user["id"], "email": user["email"]})
     return user, token
\ No newline at end of file
@@ -0,0 +1,30 @@
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from cachetools import TTLCache
+
+from .config import Config
+
+# Short-TTL cache of verified tokens so hot tokens skip both the HMAC
+# verification and the per-request user lookup. TTL is kept small so
+# revocations / deletions still propagate quickly.
+_cache: TTLCache = TTLCache(maxsize=Config.AUTH_CACHE_MAX, ttl=Config.AUTH_CACHE_TTL)
+_lock = threading.RLock()
+
+
+def get(key: bytes) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """Return the cached (payload, user) pair for a token digest, if any."""
+    with _lock:
+        return _cache.get(key)
+
+
+def put(key: bytes, payload: Dict[str, Any], user: Dict[str, Any]) -> None:
+    """Cache the verified payload and resolved user for a token digest."""
+    with _lock:
+        _cache[key] = (payload, user)
+
+
+def evict(key: bytes) -> None:
+    """Drop a token digest from the cache (e.g. after a failed verification)."""
+    with _lock:
+        _cache.pop(key, None)
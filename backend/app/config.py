@@ -3,10 +3,13 @@ from dataclasses import dataclass
 
 from dotenv import load_dotenv, find_dotenv
 
-# Load environment variables from nearest .env (project root when running from backend/)
-dotenv_path = find_dotenv()
+# Load environment variables from nearest .env (project root when running
+# from backend/). find_dotenv walks the filesystem stat()ing parents, so the
+# discovered path is cached in DOTENV_PATH for child processes and reloads.
+dotenv_path = os.environ.get("DOTENV_PATH") or find_dotenv(usecwd=True)
 if dotenv_path:
-    load_dotenv(dotenv_path=dotenv_path)
+    os.environ["DOTENV_PATH"] = dotenv_path
+    load_dotenv(dotenv_path=dotenv_path, override=False)
 else:
     load_dotenv()
 
@@ -23,12 +26,23 @@ class Config:
     DB_USER: str = os.getenv("DB_USER", "postgres")
     DB_PASSWORD: str = os.getenv("DB_PASSWORD", "")
     DB_PORT: int = int(os.getenv("DB_PORT", "5432"))
+    # ThreadedConnectionPool closes idle connections beyond minconn on
+    # putconn, discarding their prepared statements and pgvector adapter
+    # registration. Defaulting minconn to maxconn keeps the pool fully
+    # warm; size DB_POOL_MAX to expected concurrency.
+    DB_POOL_MAX: int = int(os.getenv("DB_POOL_MAX", "10"))
+    DB_POOL_MIN: int = int(os.getenv("DB_POOL_MIN", os.getenv("DB_POOL_MAX", "10")))
 
     # === File Storage ===
     UPLOAD_FOLDER: str = os.getenv(
         "UPLOAD_FOLDER",
         os.path.join(os.getcwd(), "data", "uploads")
     )
+    # When fronted by nginx, let it stream PDFs via X-Accel-Redirect instead
+    # of pushing bytes through the WSGI worker. The prefix must match an
+    # `internal` location aliased to UPLOAD_FOLDER in the nginx config.
+    USE_X_ACCEL_REDIRECT: bool = os.getenv("USE_X_ACCEL_REDIRECT", "false").lower() in ("true", "1", "yes")
+    X_ACCEL_REDIRECT_PREFIX: str = os.getenv("X_ACCEL_REDIRECT_PREFIX", "/_protected_pdfs")
 
     # === Chunking / Retrieval ===
     CHUNK_SIZE: int = int(os.getenv("CHUNK_SIZE", "450"))
@@ -50,7 +64,30 @@ class Config:
     TEXT_EMBEDDING_DIM: int = int(os.getenv("TEXT_EMBEDDING_DIM", "1024"))
     IMAGE_EMBEDDING_DIM: int = int(os.getenv("IMAGE_EMBEDDING_DIM", "1024"))
     USE_PGVECTOR: bool = os.getenv("USE_PGVECTOR", "true").lower() in ("true", "1", "yes")
+    # torch.compile the embedding models after loading (Ampere+ GPUs; first
+    # call pays the warm-up, later calls reuse the captured kernels)
+    USE_TORCH_COMPILE: bool = os.getenv("USE_TORCH_COMPILE", "false").lower() in ("true", "1", "yes")
+    HNSW_EF_SEARCH: int = int(os.getenv("HNSW_EF_SEARCH", "40"))
 
     # === Auth ===
     AUTH_SECRET: str = os.getenv("AUTH_SECRET", "change-this-secret")
     AUTH_TOKEN_MAX_AGE: int = int(os.getenv("AUTH_TOKEN_MAX_AGE", "604800"))
+    AUTH_CACHE_TTL: int = int(os.getenv("AUTH_CACHE_TTL", "10"))
+    AUTH_CACHE_MAX: int = int(os.getenv("AUTH_CACHE_MAX", "10000"))
+
+    # === Vector Store ===
+    # Optional dense fp32 memmap sidecar for the JSONB fallback ranker:
+    # one contiguous row per chunk id instead of per-row JSON decodes.
+    USE_VECTOR_STORE: bool = os.getenv("USE_VECTOR_STORE", "false").lower() in ("true", "1", "yes")
+    VECTOR_STORE_DIR: str = os.getenv(
+        "VECTOR_STORE_DIR",
+        os.path.join(os.getcwd(), "data", "vector_store")
+    )
+
+    # === Caching ===
+    DOC_CACHE_TTL: int = int(os.getenv("DOC_CACHE_TTL", "60"))
+    TEXT_EMBED_CACHE_MAX: int = int(os.getenv("TEXT_EMBED_CACHE_MAX", "10000"))
+    EMBED_CACHE_DIR: str = os.getenv(
+        "EMBED_CACHE_DIR",
+        os.path.join(os.getcwd(), "data", "embed_cache")
+    )
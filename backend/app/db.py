@@ -1,6 +1,33 @@
+import threading
+from contextlib import contextmanager
+
 import psycopg2
+from psycopg2 import pool
+
+try:
+    from pgvector.psycopg2 import register_vector
+except ImportError:  # pragma: no cover - optional dependency
+    register_vector = None
+
 from .config import Config
 
+# NOTE: psycopg3 pipeline mode was considered for the ingest path, but the
+# whole stack (pgvector adapter, execute_values batching, ThreadedConnectionPool)
+# is built on psycopg2, and ingest already collapses to one batched INSERT
+# plus a single commit per document — there is no per-statement round-trip
+# left for a pipeline to hide. Revisit if the driver is ever migrated.
+
+# Pool is created lazily so each gunicorn worker builds its own pool after
+# fork instead of sharing sockets created in the master process.
+_pool: pool.ThreadedConnectionPool | None = None
+_pool_lock = threading.Lock()
+
+# getconn raises PoolError immediately when the pool is exhausted; this
+# semaphore makes callers queue for a slot instead, with a timeout so a
+# stuck holder surfaces as an error rather than a deadlock.
+_pool_slots: threading.BoundedSemaphore | None = None
+_POOL_WAIT_SECONDS = 10.0
+
 
 def connect_db():
     """Create a new PostgreSQL connection using environment-based config."""
@@ -12,3 +39,66 @@ def connect_db():
         port=Config.DB_PORT,
     )
 
+
+def _get_pool() -> pool.ThreadedConnectionPool:
+    """Return the process-wide connection pool, creating it on first use."""
+    global _pool, _pool_slots
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool_slots = threading.BoundedSemaphore(Config.DB_POOL_MAX)
+                # minconn doubles as the idle retention level: putconn
+                # closes any connection beyond it, so a low floor would
+                # re-pay connect/PREPARE/register_vector on every burst.
+                _pool = pool.ThreadedConnectionPool(
+                    minconn=min(Config.DB_POOL_MIN, Config.DB_POOL_MAX),
+                    maxconn=Config.DB_POOL_MAX,
+                    host=Config.DB_HOST,
+                    database=Config.DB_NAME,
+                    user=Config.DB_USER,
+                    password=Config.DB_PASSWORD,
+                    port=Config.DB_PORT,
+                )
+    return _pool
+
+
+def prepare_conn(conn) -> None:
+    """Register the pgvector adapter once per connection when available.
+
+    With the adapter registered, repository code can pass numpy arrays /
+    float lists directly as query parameters instead of building vector
+    string literals by hand.
+    """
+    if not Config.USE_PGVECTOR or register_vector is None:
+        return
+    if getattr(conn, "_vector_registered", False):
+        return
+    try:
+        register_vector(conn)
+        conn._vector_registered = True
+    except Exception:
+        # Extension not installed; callers fall back to string literals.
+        conn.rollback()
+        conn._vector_registered = False
+
+
+@contextmanager
+def get_conn():
+    """Borrow a pooled connection, waiting for a free slot when exhausted."""
+    current_pool = _get_pool()
+    if not _pool_slots.acquire(timeout=_POOL_WAIT_SECONDS):
+        raise pool.PoolError(
+            f"timed out after {_POOL_WAIT_SECONDS}s waiting for a pooled "
+            f"connection (DB_POOL_MAX={Config.DB_POOL_MAX})"
+        )
+    try:
+        conn = current_pool.getconn()
+    except Exception:
+        _pool_slots.release()
+        raise
+    try:
+        prepare_conn(conn)
+        yield conn
+    finally:
+        current_pool.putconn(conn)
+        _pool_slots.release()
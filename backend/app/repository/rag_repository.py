@@ -1,13 +1,145 @@
+import io
+import json
+import threading
 from typing import Any, Dict, Iterable, List, Optional, Sequence
 
-from psycopg2.extras import Json
+import numpy as np
+from cachetools import TTLCache
+from psycopg2.extras import Json, RealDictCursor, execute_values
 
 from ..config import Config
-from ..db import connect_db
-
+from ..db import get_conn
+from ..services.quantize import binarize, quantize_int8
+from ..services.vector_store import get_store
+
+# Documents only change through replace/delete, so single-document lookups
+# (hot on the download path) are cached briefly, keyed by (doc_id, owner).
+_DOC_CACHE: TTLCache = TTLCache(maxsize=1024, ttl=Config.DOC_CACHE_TTL)
+_doc_cache_lock = threading.Lock()
+
+
+def invalidate_document(document_id: int) -> None:
+    """Drop all cached entries for a document after replace/delete."""
+    with _doc_cache_lock:
+        for key in [key for key in _DOC_CACHE if key[0] == document_id]:
+            del _DOC_CACHE[key]
+
+
+# Hot statements run on every authenticated request (or close to it), so
+# they are worth server-side preparing: the parse/plan work happens once per
+# pooled connection and later calls only ship EXECUTE with the parameters.
+_PREPARED_STATEMENTS: Dict[str, str] = {
+    "lexivion_user_by_id": (
+        "(int) AS "
+        "SELECT id, email, password_hash, created_at FROM users WHERE id = $1"
+    ),
+    "lexivion_user_by_email": (
+        "(text) AS "
+        "SELECT id, email, password_hash, created_at FROM users WHERE email = $1"
+    ),
+    "lexivion_document_by_hash": (
+        "(int, text) AS "
+        "SELECT id, filename, source_path, metadata FROM rag_documents "
+        "WHERE owner_user_id = $1 AND content_hash = $2"
+    ),
+    "lexivion_chunks_by_ids": (
+        "(int[]) AS "
+        "SELECT id, document_id, chunk_type, page_number, chunk_index, content, metadata "
+        "FROM rag_chunks WHERE id = ANY($1)"
+    ),
+    "lexivion_document_by_id": (
+        "(int) AS "
+        "SELECT id, filename, source_path, metadata FROM rag_documents WHERE id = $1"
+    ),
+    "lexivion_document_by_owner_id": (
+        "(int, int) AS "
+        "SELECT id, filename, source_path, metadata FROM rag_documents "
+        "WHERE owner_user_id = $1 AND id = $2"
+    ),
+}
+
+
+def _execute_prepared(cur, conn, name: str, params: Sequence[Any]) -> None:
+    """Run a statement from _PREPARED_STATEMENTS, preparing it on first use.
+
+    Prepared statements are session-scoped, so the set of names already
+    prepared is tracked on the pooled connection itself.
+    """
+    prepared = getattr(conn, "_prepared_statements", None)
+    if prepared is None:
+        prepared = set()
+        conn._prepared_statements = prepared
+    if name not in prepared:
+        cur.execute("PREPARE {} {}".format(name, _PREPARED_STATEMENTS[name]))
+        prepared.add(name)
+    placeholders = ", ".join(["%s"] * len(params))
+    cur.execute("EXECUTE {} ({})".format(name, placeholders), tuple(params))
+
+
+def _normalized(embedding: Optional[List[float]]) -> Optional[List[float]]:
+    """L2-normalize an embedding before storage.
+
+    Pre-normalized vectors let retrieval score with a plain dot product
+    (no per-query norms) and make the int8 quantization range symmetric.
+    Applied here, next to quantization, so every insert path gets it.
+    """
+    if embedding is None:
+        return None
+    arr = np.asarray(embedding, dtype=np.float32)
+    norm = float(np.linalg.norm(arr))
+    if norm == 0.0:
+        return list(embedding)
+    return (arr / norm).tolist()
+
+
+def _f32_bytes(embedding: Optional[List[float]]) -> Optional[bytes]:
+    """Raw float32 bytes of an embedding; frombuffer-able at search time."""
+    if embedding is None:
+        return None
+    return np.asarray(embedding, dtype=np.float32).tobytes()
+
+
+def _quantized_fields(embedding: Optional[List[float]]) -> Sequence[Any]:
+    """Return (bytes, scale, zero_point) for an embedding, or three Nones."""
+    if embedding is None:
+        return (None, None, None)
+    return quantize_int8(embedding)
+
+
+def _binarized_field(row: Dict[str, Any]) -> Optional[bytes]:
+    """Sign-quantize whichever embedding the chunk carries, if any."""
+    embedding = row.get("text_embedding") or row.get("image_embedding")
+    return binarize(embedding) if embedding is not None else None
+
+
+def _adapt_vector(conn, embedding: Optional[List[float]]) -> Any:
+    """Adapt an embedding for a vector-typed query parameter.
+
+    When the pgvector adapter is registered on the connection the embedding
+    is passed as a float32 array and serialized in C by the adapter;
+    otherwise fall back to the '[f1,f2,...]' string literal.
+    """
+    if embedding is None:
+        return None
+    if getattr(conn, "_vector_registered", False):
+        return np.asarray(embedding, dtype=np.float32)
+    return "[" + ",".join(str(f) for f in embedding) + "]"
+
+
+def insert_document(
+    conn,
+    filename: str,
+    source_path: str,
+    owner_user_id: int,
+    content_hash: str,
+    metadata: Optional[Dict[str, Any]] = None,
+    commit: bool = True,
+) -> int:
+    """Create a document record and return its id.
 
-def insert_document(conn, filename: str, source_path: str, owner_user_id: int, content_hash: str, metadata: Optional[Dict[str, Any]] = None) -> int:
-    """Create a document record and return its id."""
+    With commit=False the row joins the caller's open transaction; the
+    caller owns the final commit/rollback.
+    """
     try:
         with conn.cursor() as cur:
             cur.execute(
@@ -19,10 +151,12 @@ def insert_document(conn, filename: str, source_path: str, owner_user_id: int, c
                 (filename, source_path, owner_user_id, content_hash, Json(metadata or {})),
             )
             document_id = cur.fetchone()[0]
-        conn.commit()
+        if commit:
+            conn.commit()
         return document_id
     except Exception as exc:
-        conn.rollback()
+        if commit:
+            conn.rollback()
         raise RuntimeError(f"Failed to insert document metadata: {exc}") from exc
 
 
@@ -39,25 +173,158 @@ def insert_chunk(
     image_base64: Optional[str],
     metadata: Dict[str, Any],
     linked_chunk_id: Optional[int] = None,
+    commit: bool = True,
 ) -> int:
     """Insert a chunk row into rag_chunks and return the id."""
+    return insert_chunks_bulk(
+        conn,
+        [
+            {
+                "document_id": document_id,
+                "chunk_type": chunk_type,
+                "page_number": page_number,
+                "chunk_index": chunk_index,
+                "content": content,
+                "text_embedding": text_embedding,
+                "image_embedding": image_embedding,
+                "image_base64": image_base64,
+                "metadata": metadata,
+                "linked_chunk_id": linked_chunk_id,
+            }
+        ],
+        commit=commit,
+    )[0]
+
+
+# Batches at least this large bypass INSERT entirely and go through COPY,
+# which skips per-statement parse/plan cost on the server.
+_COPY_MIN_ROWS = 100
+
+
+def _vector_literal(embedding: Optional[List[float]]) -> Optional[str]:
+    """Render an embedding as pgvector's '[f1,f2,...]' text literal."""
+    if embedding is None:
+        return None
+    return "[" + ",".join(str(f) for f in embedding) + "]"
+
+
+def _copy_field(value: Any) -> str:
+    """Render one value for text-format COPY (tab-delimited, \\N for NULL)."""
+    if value is None:
+        return r"\N"
+    if isinstance(value, (bytes, memoryview)):
+        return r"\\x" + bytes(value).hex()
+    text = value if isinstance(value, str) else str(value)
+    return (
+        text.replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def _copy_chunks(cur, rows: Sequence[Dict[str, Any]]) -> List[int]:
+    """Bulk-load chunk rows via COPY and return their pre-assigned ids.
+
+    COPY has no RETURNING, so the ids are drawn from the table's sequence
+    up front and shipped as an explicit column. Text format (rather than
+    binary) keeps vectors and jsonb in their documented literal forms.
+    """
+    cur.execute(
+        "SELECT nextval(pg_get_serial_sequence('rag_chunks', 'id')) "
+        "FROM generate_series(1, %s);",
+        (len(rows),),
+    )
+    chunk_ids = [r[0] for r in cur.fetchall()]
+
+    columns = [
+        "id",
+        "document_id",
+        "chunk_type",
+        "page_number",
+        "chunk_index",
+        "content",
+        "paired_text_embedding",
+        "paired_text_embedding_f32",
+        "embedding",
+    ]
+    if Config.USE_PGVECTOR:
+        columns += ["text_embedding_vector", "image_embedding_vector"]
+    columns += [
+        "text_embedding_q",
+        "text_embedding_scale",
+        "text_embedding_zp",
+        "image_embedding_q",
+        "image_embedding_scale",
+        "image_embedding_zp",
+        "embedding_bits",
+        "image_base64",
+        "metadata",
+        "linked_chunk_id",
+    ]
+
+    buffer = io.StringIO()
+    for chunk_id, row in zip(chunk_ids, rows):
+        text_embedding = row.get("text_embedding")
+        image_embedding = row.get("image_embedding")
+        fields: List[Any] = [
+            chunk_id,
+            row["document_id"],
+            row["chunk_type"],
+            row.get("page_number"),
+            row.get("chunk_index"),
+            row.get("content"),
+            json.dumps(text_embedding) if text_embedding is not None else None,
+            _f32_bytes(text_embedding),
+            json.dumps(image_embedding) if image_embedding is not None else None,
+        ]
+        if Config.USE_PGVECTOR:
+            fields += [_vector_literal(text_embedding), _vector_literal(image_embedding)]
+        fields += [
+            *_quantized_fields(text_embedding),
+            *_quantized_fields(image_embedding),
+            _binarized_field(row),
+            row.get("image_base64"),
+            json.dumps(row.get("metadata") or {}),
+            row.get("linked_chunk_id"),
+        ]
+        buffer.write("\t".join(_copy_field(field) for field in fields) + "\n")
+    buffer.seek(0)
+    cur.copy_expert(
+        "COPY rag_chunks ({}) FROM STDIN".format(", ".join(columns)), buffer
+    )
+    return chunk_ids
+
+
+def insert_chunks_bulk(conn, rows: Sequence[Dict[str, Any]], commit: bool = True) -> List[int]:
+    """Insert many chunk rows in one round-trip and return their ids.
+
+    Each row dict uses the same field names as insert_chunk's keyword
+    arguments. Small batches go through a single execute_values statement;
+    batches of _COPY_MIN_ROWS or more switch to COPY, which skips INSERT
+    parse/plan cost entirely. With commit=False the batch joins the
+    caller's open transaction, protected by a savepoint so one failed
+    batch does not abort the whole ingest.
+    """
+    if not rows:
+        return []
+    rows = [
+        dict(
+            row,
+            text_embedding=_normalized(row.get("text_embedding")),
+            image_embedding=_normalized(row.get("image_embedding")),
+        )
+        for row in rows
+    ]
+    use_copy = len(rows) >= _COPY_MIN_ROWS
     try:
         with conn.cursor() as cur:
-            # Convert embeddings to vector format if pgvector is enabled
-            text_vector = None
-            image_vector = None
-            
-            if Config.USE_PGVECTOR:
-                if text_embedding is not None:
-                    # Convert list to vector string format: '[1.0,2.0,3.0]'
-                    text_vector = "[" + ",".join(str(f) for f in text_embedding) + "]"
-                if image_embedding is not None:
-                    image_vector = "[" + ",".join(str(f) for f in image_embedding) + "]"
-            
-            # Build SQL with conditional vector columns
-            if Config.USE_PGVECTOR:
-                cur.execute(
-                    """
+            if not commit:
+                cur.execute("SAVEPOINT chunk_batch;")
+            if use_copy:
+                chunk_ids = _copy_chunks(cur, rows)
+            elif Config.USE_PGVECTOR:
+                sql = """
                     INSERT INTO rag_chunks (
                         document_id,
                         chunk_type,
@@ -65,34 +332,51 @@ def insert_chunk(
                         chunk_index,
                         content,
                         paired_text_embedding,
+                        paired_text_embedding_f32,
                         embedding,
                         text_embedding_vector,
                         image_embedding_vector,
+                        text_embedding_q,
+                        text_embedding_scale,
+                        text_embedding_zp,
+                        image_embedding_q,
+                        image_embedding_scale,
+                        image_embedding_zp,
+                        embedding_bits,
                         image_base64,
                         metadata,
                         linked_chunk_id
                     )
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s::vector, %s::vector, %s, %s, %s)
+                    VALUES %s
                     RETURNING id;
-                    """,
-                    (
-                        document_id,
-                        chunk_type,
-                        page_number,
-                        chunk_index,
-                        content,
-                        Json(text_embedding) if text_embedding is not None else None,
-                        Json(image_embedding) if image_embedding is not None else None,
-                        text_vector,
-                        image_vector,
-                        image_base64,
-                        Json(metadata),
-                        linked_chunk_id,
-                    ),
+                """
+                template = (
+                    "(%s, %s, %s, %s, %s, %s, %s, %s, %s::vector, %s::vector,"
+                    " %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
                 )
+                values = [
+                    (
+                        row["document_id"],
+                        row["chunk_type"],
+                        row.get("page_number"),
+                        row.get("chunk_index"),
+                        row.get("content"),
+                        Json(row["text_embedding"]) if row.get("text_embedding") is not None else None,
+                        _f32_bytes(row.get("text_embedding")),
+                        Json(row["image_embedding"]) if row.get("image_embedding") is not None else None,
+                        _adapt_vector(conn, row.get("text_embedding")),
+                        _adapt_vector(conn, row.get("image_embedding")),
+                        *_quantized_fields(row.get("text_embedding")),
+                        *_quantized_fields(row.get("image_embedding")),
+                        _binarized_field(row),
+                        row.get("image_base64"),
+                        Json(row.get("metadata") or {}),
+                        row.get("linked_chunk_id"),
+                    )
+                    for row in rows
+                ]
             else:
-                cur.execute(
-                    """
+                sql = """
                     INSERT INTO rag_chunks (
                         document_id,
                         chunk_type,
@@ -100,43 +384,95 @@ def insert_chunk(
                         chunk_index,
                         content,
                         paired_text_embedding,
+                        paired_text_embedding_f32,
                         embedding,
+                        text_embedding_q,
+                        text_embedding_scale,
+                        text_embedding_zp,
+                        image_embedding_q,
+                        image_embedding_scale,
+                        image_embedding_zp,
+                        embedding_bits,
                         image_base64,
                         metadata,
                         linked_chunk_id
                     )
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    VALUES %s
                     RETURNING id;
-                    """,
+                """
+                template = "(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
+                values = [
                     (
-                        document_id,
-                        chunk_type,
-                        page_number,
-                        chunk_index,
-                        content,
-                        Json(text_embedding) if text_embedding is not None else None,
-                        Json(image_embedding) if image_embedding is not None else None,
-                        image_base64,
-                        Json(metadata),
-                        linked_chunk_id,
-                    ),
-                )
-            chunk_id = cur.fetchone()[0]
-        conn.commit()
-        return chunk_id
+                        row["document_id"],
+                        row["chunk_type"],
+                        row.get("page_number"),
+                        row.get("chunk_index"),
+                        row.get("content"),
+                        Json(row["text_embedding"]) if row.get("text_embedding") is not None else None,
+                        _f32_bytes(row.get("text_embedding")),
+                        Json(row["image_embedding"]) if row.get("image_embedding") is not None else None,
+                        *_quantized_fields(row.get("text_embedding")),
+                        *_quantized_fields(row.get("image_embedding")),
+                        _binarized_field(row),
+                        row.get("image_base64"),
+                        Json(row.get("metadata") or {}),
+                        row.get("linked_chunk_id"),
+                    )
+                    for row in rows
+                ]
+            if not use_copy:
+                result = execute_values(cur, sql, values, template=template, page_size=500, fetch=True)
+                chunk_ids = [r[0] for r in result]
+            if not commit:
+                cur.execute("RELEASE SAVEPOINT chunk_batch;")
+        if commit:
+            conn.commit()
+        store = get_store()
+        if store is not None:
+            with_text = [
+                (chunk_id, row["text_embedding"])
+                for chunk_id, row in zip(chunk_ids, rows)
+                if row.get("text_embedding") is not None
+            ]
+            if with_text:
+                store.add_batch([c for c, _ in with_text], [e for _, e in with_text])
+        return chunk_ids
     except Exception as exc:
-        conn.rollback()
+        if commit:
+            conn.rollback()
+        else:
+            with conn.cursor() as cur:
+                cur.execute("ROLLBACK TO SAVEPOINT chunk_batch;")
         raise RuntimeError(f"Failed to insert chunk: {exc}") from exc
 
 
-def fetch_text_chunks(limit: Optional[int] = None, owner_user_id: Optional[int] = None) -> List[Dict[str, Any]]:
-    """Fetch text chunks ordered by recency."""
-    conn = connect_db()
-    try:
+def fetch_text_chunks(
+    limit: Optional[int] = None,
+    owner_user_id: Optional[int] = None,
+    include_embedding: bool = False,
+) -> List[Dict[str, Any]]:
+    """Fetch text chunks ordered by recency.
+
+    paired_text_embedding is a JSONB copy of the full embedding (~10 KB+
+    serialized per row), so it is only selected when the caller actually
+    needs it for reranking.
+    """
+    with get_conn() as conn:
         limit_clause = "LIMIT %s" if limit else ""
         params: Sequence[Any] = (limit,) if limit else ()
-        with conn.cursor() as cur:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
             if owner_user_id is not None:
+                # Rows with uint8 codes are ranked from those alone, so the
+                # 4 KB float copies only ship for legacy rows without codes.
+                embedding_column = (
+                    "CASE WHEN c.text_embedding_q IS NULL THEN c.paired_text_embedding END"
+                    " AS paired_text_embedding, "
+                    "CASE WHEN c.text_embedding_q IS NULL THEN c.paired_text_embedding_f32 END"
+                    " AS paired_text_embedding_f32, "
+                    "c.embedding_bits, c.text_embedding_q, c.text_embedding_scale, c.text_embedding_zp,"
+                    if include_embedding
+                    else ""
+                )
                 cur.execute(
                     f"""
                     SELECT
@@ -145,7 +481,7 @@ def fetch_text_chunks(limit: Optional[int] = None, owner_user_id: Optional[int]
                         c.page_number,
                         c.chunk_index,
                         c.content,
-                        c.paired_text_embedding,
+                        {embedding_column}
                         c.metadata
                     FROM rag_chunks c
                     JOIN rag_documents d ON d.id = c.document_id
@@ -156,6 +492,15 @@ def fetch_text_chunks(limit: Optional[int] = None, owner_user_id: Optional[int]
                     ((owner_user_id,) + params) if params else (owner_user_id,),
                 )
             else:
+                embedding_column = (
+                    "CASE WHEN text_embedding_q IS NULL THEN paired_text_embedding END"
+                    " AS paired_text_embedding, "
+                    "CASE WHEN text_embedding_q IS NULL THEN paired_text_embedding_f32 END"
+                    " AS paired_text_embedding_f32, "
+                    "embedding_bits, text_embedding_q, text_embedding_scale, text_embedding_zp,"
+                    if include_embedding
+                    else ""
+                )
                 cur.execute(
                     f"""
                     SELECT
@@ -164,7 +509,7 @@ def fetch_text_chunks(limit: Optional[int] = None, owner_user_id: Optional[int]
                         page_number,
                         chunk_index,
                         content,
-                        paired_text_embedding,
+                        {embedding_column}
                         metadata
                     FROM rag_chunks
                     WHERE chunk_type = 'text' AND paired_text_embedding IS NOT NULL
@@ -174,31 +519,11 @@ def fetch_text_chunks(limit: Optional[int] = None, owner_user_id: Optional[int]
                     params,
                 )
             rows = cur.fetchall()
-        chunks: List[Dict[str, Any]] = []
         for row in rows:
-            (
-                chunk_id,
-                document_id,
-                page_number,
-                chunk_index,
-                content,
-                embedding,
-                metadata,
-            ) = row
-            chunks.append(
-                {
-                    "id": chunk_id,
-                    "document_id": document_id,
-                    "page_number": page_number,
-                    "chunk_index": chunk_index,
-                    "content": content,
-                    "paired_text_embedding": embedding,
-                    "metadata": metadata or {},
-                }
-            )
-        return chunks
-    finally:
-        conn.close()
+            row["metadata"] = row["metadata"] or {}
+            if not include_embedding:
+                row["paired_text_embedding"] = None
+        return rows
 
 
 def fetch_images_for_text_chunks(parent_chunk_ids: Sequence[int]) -> Dict[int, List[Dict[str, Any]]]:
@@ -206,9 +531,8 @@ def fetch_images_for_text_chunks(parent_chunk_ids: Sequence[int]) -> Dict[int, L
     if not parent_chunk_ids:
         return {}
 
-    conn = connect_db()
-    try:
-        with conn.cursor() as cur:
+    with get_conn() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
             cur.execute(
                 """
                 SELECT
@@ -227,77 +551,22 @@ def fetch_images_for_text_chunks(parent_chunk_ids: Sequence[int]) -> Dict[int, L
             rows = cur.fetchall()
         grouped: Dict[int, List[Dict[str, Any]]] = {}
         for row in rows:
-            (
-                chunk_id,
-                linked_chunk_id,
-                page_number,
-                chunk_index,
-                image_b64,
-                metadata,
-            ) = row
-            grouped.setdefault(linked_chunk_id, []).append(
-                {
-                    "id": chunk_id,
-                    "linked_chunk_id": linked_chunk_id,
-                    "page_number": page_number,
-                    "chunk_index": chunk_index,
-                    "image_base64": image_b64,
-                    "metadata": metadata or {},
-                }
-            )
+            row["metadata"] = row["metadata"] or {}
+            grouped.setdefault(row["linked_chunk_id"], []).append(row)
         return grouped
-    finally:
-        conn.close()
 
 
 def fetch_chunks_by_ids(chunk_ids: Iterable[int]) -> List[Dict[str, Any]]:
     if not chunk_ids:
         return []
 
-    conn = connect_db()
-    try:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT
-                    id,
-                    document_id,
-                    chunk_type,
-                    page_number,
-                    chunk_index,
-                    content,
-                    metadata
-                FROM rag_chunks
-                WHERE id = ANY(%s)
-                """,
-                (list(chunk_ids),),
-            )
+    with get_conn() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            _execute_prepared(cur, conn, "lexivion_chunks_by_ids", (list(chunk_ids),))
             rows = cur.fetchall()
-        results: List[Dict[str, Any]] = []
         for row in rows:
-            (
-                chunk_id,
-                document_id,
-                chunk_type,
-                page_number,
-                chunk_index,
-                content,
-                metadata,
-            ) = row
-            results.append(
-                {
-                    "id": chunk_id,
-                    "document_id": document_id,
-                    "chunk_type": chunk_type,
-                    "page_number": page_number,
-                    "chunk_index": chunk_index,
-                    "content": content,
-                    "metadata": metadata or {},
-                }
-            )
-        return results
-    finally:
-        conn.close()
+            row["metadata"] = row["metadata"] or {}
+        return rows
 
 
 def fetch_documents_by_ids(document_ids: Iterable[int], owner_user_id: Optional[int] = None) -> Dict[int, Dict[str, Any]]:
@@ -305,9 +574,8 @@ def fetch_documents_by_ids(document_ids: Iterable[int], owner_user_id: Optional[
     if not doc_ids:
         return {}
 
-    conn = connect_db()
-    try:
-        with conn.cursor() as cur:
+    with get_conn() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
             if owner_user_id is not None:
                 cur.execute(
                     """
@@ -327,52 +595,89 @@ def fetch_documents_by_ids(document_ids: Iterable[int], owner_user_id: Optional[
                     (doc_ids,),
                 )
             rows = cur.fetchall()
-        return {
-            row[0]: {
-                "id": row[0],
-                "filename": row[1],
-                "source_path": row[2],
-                "metadata": row[3] or {},
-            }
-            for row in rows
-        }
-    finally:
-        conn.close()
+        for row in rows:
+            row["metadata"] = row["metadata"] or {}
+        return {row["id"]: row for row in rows}
 
 
 def fetch_document_by_id(document_id: int, owner_user_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
-    documents = fetch_documents_by_ids([document_id], owner_user_id)
-    return documents.get(document_id)
+    """Fetch a single document, scoped by owner in the WHERE clause.
+
+    Ownership is checked inside the query so non-owners are rejected by an
+    index lookup on (owner_user_id, id) instead of fetch-then-filter.
+    Results are served from a short-TTL cache; replace/delete invalidate.
+    """
+    cache_key = (document_id, owner_user_id)
+    with _doc_cache_lock:
+        cached = _DOC_CACHE.get(cache_key)
+    if cached is not None:
+        return dict(cached)
+    with get_conn() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            if owner_user_id is not None:
+                _execute_prepared(cur, conn, "lexivion_document_by_owner_id", (owner_user_id, document_id))
+            else:
+                _execute_prepared(cur, conn, "lexivion_document_by_id", (document_id,))
+            row = cur.fetchone()
+        if not row:
+            return None
+        row["metadata"] = row["metadata"] or {}
+        with _doc_cache_lock:
+            _DOC_CACHE[cache_key] = dict(row)
+        return row
+
+
+def _set_hnsw_ef_search(cur, conn, top_k: int) -> None:
+    """Set the HNSW recall/latency knob for the current transaction.
+
+    Scaled with top_k so recall holds up for larger requests (see
+    migration 007). Older pgvector builds without the GUC proceed with
+    their defaults.
+    """
+    try:
+        cur.execute(
+            "SET LOCAL hnsw.ef_search = %s;",
+            (max(Config.HNSW_EF_SEARCH, top_k * 4),),
+        )
+    except Exception:
+        conn.rollback()
 
 
 def fetch_text_chunks_with_vector_search(
-    query_embedding: List[float], top_k: int, owner_user_id: Optional[int] = None
+    query_embedding: List[float],
+    top_k: int,
+    owner_user_id: Optional[int] = None,
+    include_embedding: bool = False,
 ) -> List[Dict[str, Any]]:
-    """Fetch top-k text chunks using pgvector cosine similarity search."""
+    """Fetch top-k text chunks using pgvector cosine similarity search.
+
+    The ranking distance already comes back as `similarity`, so the bulky
+    paired_text_embedding JSONB is skipped unless explicitly requested.
+    """
     if not Config.USE_PGVECTOR:
         raise RuntimeError("pgvector is not enabled")
-    
-    conn = connect_db()
-    try:
-        # Convert query embedding to vector string format
-        query_vector = "[" + ",".join(str(f) for f in query_embedding) + "]"
-        
-        with conn.cursor() as cur:
+
+    with get_conn() as conn:
+        query_vector = _adapt_vector(conn, query_embedding)
+
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            _set_hnsw_ef_search(cur, conn, top_k)
             if owner_user_id is not None:
+                embedding_column = "c.paired_text_embedding," if include_embedding else ""
                 cur.execute(
-                    """
+                    f"""
                     SELECT
                         c.id,
                         c.document_id,
                         c.page_number,
                         c.chunk_index,
                         c.content,
-                        c.paired_text_embedding,
+                        {embedding_column}
                         c.metadata,
                         1 - (c.text_embedding_vector <=> %s::vector) as similarity
                     FROM rag_chunks c
                     JOIN rag_documents d ON d.id = c.document_id
-                    WHERE c.chunk_type = 'text' 
+                    WHERE c.chunk_type = 'text'
                       AND c.text_embedding_vector IS NOT NULL
                       AND d.owner_user_id = %s
                     ORDER BY c.text_embedding_vector <=> %s::vector
@@ -381,19 +686,20 @@ def fetch_text_chunks_with_vector_search(
                     (query_vector, owner_user_id, query_vector, top_k),
                 )
             else:
+                embedding_column = "paired_text_embedding," if include_embedding else ""
                 cur.execute(
-                    """
+                    f"""
                     SELECT
                         id,
                         document_id,
                         page_number,
                         chunk_index,
                         content,
-                        paired_text_embedding,
+                        {embedding_column}
                         metadata,
                         1 - (text_embedding_vector <=> %s::vector) as similarity
                     FROM rag_chunks
-                    WHERE chunk_type = 'text' 
+                    WHERE chunk_type = 'text'
                       AND text_embedding_vector IS NOT NULL
                     ORDER BY text_embedding_vector <=> %s::vector
                     LIMIT %s;
@@ -401,39 +707,107 @@ def fetch_text_chunks_with_vector_search(
                     (query_vector, query_vector, top_k),
                 )
             rows = cur.fetchall()
-        
-        chunks: List[Dict[str, Any]] = []
+
         for row in rows:
-            (
-                chunk_id,
-                document_id,
-                page_number,
-                chunk_index,
-                content,
-                embedding,
-                metadata,
-                similarity,
-            ) = row
-            chunks.append(
-                {
-                    "id": chunk_id,
-                    "document_id": document_id,
-                    "page_number": page_number,
-                    "chunk_index": chunk_index,
-                    "content": content,
-                    "paired_text_embedding": embedding,
-                    "metadata": metadata or {},
-                    "similarity": float(similarity) if similarity is not None else 0.0,
-                }
+            row["metadata"] = row["metadata"] or {}
+            if not include_embedding:
+                row["paired_text_embedding"] = None
+            row["similarity"] = float(row["similarity"]) if row["similarity"] is not None else 0.0
+        return rows
+
+
+def fetch_text_chunks_with_images(
+    query_embedding: List[float], top_k: int, owner_user_id: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """Vector search returning each hit with its linked images pre-joined.
+
+    Fuses fetch_text_chunks_with_vector_search and
+    fetch_images_for_text_chunks into one statement (CTE + lateral image
+    aggregation) so the search path costs a single round-trip instead of two.
+    """
+    if not Config.USE_PGVECTOR:
+        raise RuntimeError("pgvector is not enabled")
+
+    with get_conn() as conn:
+        query_vector = _adapt_vector(conn, query_embedding)
+
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            _set_hnsw_ef_search(cur, conn, top_k)
+            if owner_user_id is not None:
+                hits_sql = """
+                    SELECT
+                        c.id,
+                        c.document_id,
+                        c.page_number,
+                        c.chunk_index,
+                        c.content,
+                        c.metadata,
+                        1 - (c.text_embedding_vector <=> %s::vector) as similarity
+                    FROM rag_chunks c
+                    JOIN rag_documents d ON d.id = c.document_id
+                    WHERE c.chunk_type = 'text'
+                      AND c.text_embedding_vector IS NOT NULL
+                      AND d.owner_user_id = %s
+                    ORDER BY c.text_embedding_vector <=> %s::vector
+                    LIMIT %s
+                """
+                params = (query_vector, owner_user_id, query_vector, top_k)
+            else:
+                hits_sql = """
+                    SELECT
+                        id,
+                        document_id,
+                        page_number,
+                        chunk_index,
+                        content,
+                        metadata,
+                        1 - (text_embedding_vector <=> %s::vector) as similarity
+                    FROM rag_chunks
+                    WHERE chunk_type = 'text'
+                      AND text_embedding_vector IS NOT NULL
+                    ORDER BY text_embedding_vector <=> %s::vector
+                    LIMIT %s
+                """
+                params = (query_vector, query_vector, top_k)
+            cur.execute(
+                f"""
+                WITH hits AS ({hits_sql})
+                SELECT
+                    h.*,
+                    COALESCE(
+                        jsonb_agg(
+                            jsonb_build_object(
+                                'id', i.id,
+                                'linked_chunk_id', i.linked_chunk_id,
+                                'page_number', i.page_number,
+                                'chunk_index', i.chunk_index,
+                                'image_base64', i.image_base64,
+                                'metadata', COALESCE(i.metadata, '{{}}'::jsonb)
+                            )
+                        ) FILTER (WHERE i.id IS NOT NULL),
+                        '[]'::jsonb
+                    ) AS images
+                FROM hits h
+                LEFT JOIN rag_chunks i
+                  ON i.chunk_type = 'image' AND i.linked_chunk_id = h.id
+                GROUP BY
+                    h.id, h.document_id, h.page_number, h.chunk_index,
+                    h.content, h.metadata, h.similarity
+                ORDER BY h.similarity DESC;
+                """,
+                params,
             )
-        return chunks
-    finally:
-        conn.close()
+            rows = cur.fetchall()
+
+        for row in rows:
+            row["metadata"] = row["metadata"] or {}
+            row["similarity"] = float(row["similarity"]) if row["similarity"] is not None else 0.0
+            row["images"] = row["images"] or []
+        return rows
 
 
 def create_user(email: str, password_hash: str) -> Dict[str, Any]:
-    conn = connect_db()
-    try:
+    with get_conn() as conn:
         with conn.cursor() as cur:
             cur.execute(
                 """
@@ -446,71 +820,38 @@ def create_user(email: str, password_hash: str) -> Dict[str, Any]:
             row = cur.fetchone()
         conn.commit()
         return {"id": row[0], "email": row[1], "password_hash": password_hash, "created_at": row[2]}
-    finally:
-        conn.close()
 
 
 def fetch_user_by_email(email: str) -> Optional[Dict[str, Any]]:
-    conn = connect_db()
-    try:
+    with get_conn() as conn:
         with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT id, email, password_hash, created_at
-                FROM users
-                WHERE email = %s
-                """,
-                (email,),
-            )
+            _execute_prepared(cur, conn, "lexivion_user_by_email", (email,))
             row = cur.fetchone()
         if not row:
             return None
         return {"id": row[0], "email": row[1], "password_hash": row[2], "created_at": row[3]}
-    finally:
-        conn.close()
 
 
 def fetch_user_by_id(user_id: int) -> Optional[Dict[str, Any]]:
-    conn = connect_db()
-    try:
+    with get_conn() as conn:
         with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT id, email, password_hash, created_at
-                FROM users
-                WHERE id = %s
-                """,
-                (user_id,),
-            )
+            _execute_prepared(cur, conn, "lexivion_user_by_id", (user_id,))
             row = cur.fetchone()
         if not row:
             return None
         return {"id": row[0], "email": row[1], "password_hash": row[2], "created_at": row[3]}
-    finally:
-        conn.close()
 def fetch_document_by_hash(owner_user_id: int, content_hash: str) -> Optional[Dict[str, Any]]:
-    conn = connect_db()
-    try:
+    with get_conn() as conn:
         with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT id, filename, source_path, metadata
-                FROM rag_documents
-                WHERE owner_user_id = %s AND content_hash = %s
-                """,
-                (owner_user_id, content_hash),
-            )
+            _execute_prepared(cur, conn, "lexivion_document_by_hash", (owner_user_id, content_hash))
             row = cur.fetchone()
         if not row:
             return None
         return {"id": row[0], "filename": row[1], "source_path": row[2], "metadata": row[3] or {}}
-    finally:
-        conn.close()
 
 
 def update_document_metadata(document_id: int, filename: str, source_path: str, content_hash: str, metadata: Optional[Dict[str, Any]] = None) -> None:
-    conn = connect_db()
-    try:
+    with get_conn() as conn:
         with conn.cursor() as cur:
             cur.execute(
                 """
@@ -524,21 +865,22 @@ def update_document_metadata(document_id: int, filename: str, source_path: str,
                 (filename, source_path, content_hash, Json(metadata or {}), document_id),
             )
         conn.commit()
-    finally:
-        conn.close()
+    invalidate_document(document_id)
 
 
 def delete_chunks_for_document(document_id: int) -> None:
-    conn = connect_db()
-    try:
+    with get_conn() as conn:
         with conn.cursor() as cur:
             cur.execute(
                 """
-                DELETE FROM rag_chunks WHERE document_id = %s
+                DELETE FROM rag_chunks WHERE document_id = %s RETURNING id
                 """,
                 (document_id,),
             )
+            deleted_ids = [row[0] for row in cur.fetchall()]
         conn.commit()
-    finally:
-        conn.close()
+    store = get_store()
+    if store is not None:
+        store.discard(deleted_ids)
+    invalidate_document(document_id)
 
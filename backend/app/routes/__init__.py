@@ -0,0 +1,21 @@
+"""Route blueprints and the lazy-service resolver they share."""
+import importlib
+import sys
+from typing import Any
+
+
+def resolve_service(module_name: str, attr: str, source: str) -> Any:
+    """Resolve a service callable on first use and cache it on a route module.
+
+    Route modules keep each service as a patchable module attribute that
+    starts as None; the implementation is imported only when the first
+    request needs it, so importing a blueprint never loads the embedding
+    models. `source` is given relative to this package (e.g.
+    "..services.pdf_processing").
+    """
+    module = sys.modules[module_name]
+    value = getattr(module, attr)
+    if value is None:
+        value = getattr(importlib.import_module(source, __name__), attr)
+        setattr(module, attr, value)
+    return value
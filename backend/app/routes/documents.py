@@ -1,19 +1,31 @@
 import os
-from flask import Blueprint, abort, jsonify, send_file, g, request
+import unicodedata
+from urllib.parse import quote
 
+from flask import Blueprint, Response, abort, jsonify, send_file, request
+
+from ..config import Config
 from ..repository.rag_repository import fetch_document_by_id, delete_chunks_for_document
-from ..auth import require_auth
-from ..services.pdf_processing import process_pdf
+from ..auth import current_user_id, require_auth
+from . import resolve_service
 import hashlib
 
 bp = Blueprint("documents", __name__)
 
+# Resolved lazily via resolve_service so importing the blueprint does not
+# load the embedding models; kept as a module attribute so tests can patch it.
+process_pdf = None
+
+
+def _get_process_pdf():
+    return resolve_service(__name__, "process_pdf", "..services.pdf_processing")
+
 
 @bp.route("/documents/<int:doc_id>", methods=["GET"])
 @require_auth
 def get_document(doc_id: int):
-    user_id = g.current_user["id"] if isinstance(g.current_user, dict) else g.current_user.get("id")
-    document = fetch_document_by_id(doc_id, owner_user_id=int(user_id))
+    user_id = current_user_id()
+    document = fetch_document_by_id(doc_id, owner_user_id=user_id)
     if not document:
         abort(404, description="Document not found")
     return jsonify(
@@ -28,8 +40,8 @@ def get_document(doc_id: int):
 @bp.route("/documents/<int:doc_id>/file", methods=["GET"])
 @require_auth
 def stream_document(doc_id: int):
-    user_id = g.current_user["id"] if isinstance(g.current_user, dict) else g.current_user.get("id")
-    document = fetch_document_by_id(doc_id, owner_user_id=int(user_id))
+    user_id = current_user_id()
+    document = fetch_document_by_id(doc_id, owner_user_id=user_id)
     if not document:
         abort(404, description="Document not found")
 
@@ -37,19 +49,54 @@ def stream_document(doc_id: int):
     if not source_path or not os.path.exists(source_path):
         abort(404, description="Document file missing on server")
 
+    if Config.USE_X_ACCEL_REDIRECT:
+        # Auth and ownership are checked above; nginx serves the bytes from
+        # its internal location so no worker is tied up for the download.
+        # The redirect is a URI, so the filename must be percent-encoded —
+        # spaces, '%', '?' or non-latin-1 bytes would otherwise break the
+        # internal location match (or the header encoding itself).
+        response = Response(status=200)
+        response.headers["X-Accel-Redirect"] = "{}/{}".format(
+            Config.X_ACCEL_REDIRECT_PREFIX.rstrip("/"), quote(os.path.basename(source_path))
+        )
+        response.headers["Content-Type"] = "application/pdf"
+        # Same RFC 6266 fallback werkzeug's send_file uses: a plain ASCII
+        # filename when possible, otherwise an ASCII approximation plus the
+        # UTF-8 filename* form. Headers.set quotes the parameters.
+        filename = document["filename"]
+        try:
+            filename.encode("ascii")
+            names = {"filename": filename}
+        except UnicodeEncodeError:
+            simple = (
+                unicodedata.normalize("NFKD", filename)
+                .encode("ascii", "ignore")
+                .decode("ascii")
+            )
+            names = {
+                "filename": simple,
+                "filename*": "UTF-8''{}".format(quote(filename, safe="!#$&+-.^_`|~")),
+            }
+        response.headers.set("Content-Disposition", "inline", **names)
+        return response
+
+    # conditional=True enables 304/Range handling and lets the WSGI server
+    # use its wsgi.file_wrapper (sendfile) path instead of Python chunking.
     return send_file(
         source_path,
         mimetype="application/pdf",
         download_name=document["filename"],
         as_attachment=False,
+        conditional=True,
+        max_age=3600,
     )
 
 
 @bp.route("/documents/<int:doc_id>/replace", methods=["POST"])
 @require_auth
 def replace_document(doc_id: int):
-    user_id = g.current_user["id"] if isinstance(g.current_user, dict) else g.current_user.get("id")
-    document = fetch_document_by_id(doc_id, owner_user_id=int(user_id))
+    user_id = current_user_id()
+    document = fetch_document_by_id(doc_id, owner_user_id=user_id)
     if not document:
         abort(404, description="Document not found")
     if "file" not in request.files:
@@ -64,20 +111,24 @@ def replace_document(doc_id: int):
     os.makedirs(target_dir, exist_ok=True)
     safe_filename = os.path.basename(file.filename)
     new_path = os.path.join(target_dir, safe_filename)
+    # file_digest keeps the digest loop in OpenSSL (SHA-NI where present)
+    # and releases the GIL; the upload is then saved from the same spooled
+    # stream without a second pass through Python code.
+    file.stream.seek(0)
+    content_hash = hashlib.file_digest(file.stream, "sha256").hexdigest()
+    file.stream.seek(0)
     file.save(new_path)
 
-    hasher = hashlib.sha256()
-    with open(new_path, 'rb') as f:
-        for chunk in iter(lambda: f.read(1024 * 1024), b''):
-            if not chunk:
-                break
-            hasher.update(chunk)
-    content_hash = hasher.hexdigest()
-
     if document.get("source_path") and os.path.abspath(document["source_path"]) != os.path.abspath(new_path):
+        # Imported here: a top-level import would pull services.search (and
+        # the embedding/Gemini stack behind it) into blueprint import.
+        from ..services.search import invalidate_llm_cache
+
         delete_chunks_for_document(doc_id)
+        # Cached LLM responses may reference the deleted chunk ids
+        invalidate_llm_cache()
 
-    result = process_pdf(new_path, safe_filename, owner_user_id=int(user_id), content_hash=content_hash, document_id=doc_id)
+    result = _get_process_pdf()(new_path, safe_filename, owner_user_id=user_id, content_hash=content_hash, document_id=doc_id)
     return jsonify({
         "message": f"{safe_filename} replaced successfully",
         "document_id": doc_id,
@@ -1,14 +1,22 @@
 import os
-from flask import Blueprint, current_app, jsonify, request, g
+from flask import Blueprint, current_app, jsonify, request
 
-from ..services.pdf_processing import process_pdf
-from ..auth import require_auth
+from ..auth import current_user_id, require_auth
 from ..repository.rag_repository import fetch_document_by_hash
+from . import resolve_service
 import hashlib
 
 
 bp = Blueprint("ingest", __name__)
 
+# Resolved lazily via resolve_service so importing the blueprint does not
+# load the embedding models; kept as a module attribute so tests can patch it.
+process_pdf = None
+
+
+def _get_process_pdf():
+    return resolve_service(__name__, "process_pdf", "..services.pdf_processing")
+
 
 @bp.route("/upload", methods=["POST"])
 @require_auth
@@ -31,19 +39,17 @@ def upload_pdf():
         safe_filename = os.path.basename(file.filename)
         file_path = os.path.join(target_dir, safe_filename)
         
+        # file_digest keeps the digest loop in OpenSSL (SHA-NI where present)
+        # and releases the GIL; the upload is then saved from the same
+        # spooled stream without a second pass through Python code.
+        file.stream.seek(0)
+        content_hash = hashlib.file_digest(file.stream, "sha256").hexdigest()
+        file.stream.seek(0)
         file.save(file_path)
 
-        user_id = g.current_user["id"] if isinstance(g.current_user, dict) else g.current_user.get("id")
-
-        hasher = hashlib.sha256()
-        with open(file_path, 'rb') as f:
-            for chunk in iter(lambda: f.read(1024 * 1024), b''):
-                if not chunk:
-                    break
-                hasher.update(chunk)
-        content_hash = hasher.hexdigest()
+        user_id = current_user_id()
 
-        existing = fetch_document_by_hash(int(user_id), content_hash)
+        existing = fetch_document_by_hash(user_id, content_hash)
         if existing:
             return jsonify({
                 "error": "Duplicate document for this user",
@@ -52,7 +58,7 @@ def upload_pdf():
                 "can_replace": True,
             }), 409
 
-        ingestion_result = process_pdf(file_path, safe_filename, owner_user_id=int(user_id), content_hash=content_hash)
+        ingestion_result = _get_process_pdf()(file_path, safe_filename, owner_user_id=user_id, content_hash=content_hash)
         
         return jsonify({
             "message": f"{safe_filename} processed successfully!",
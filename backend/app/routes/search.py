@@ -1,11 +1,19 @@
-from flask import Blueprint, jsonify, request, g
+from flask import Blueprint, jsonify, request
 
-from ..services.search import search_rag_with_images
-from ..auth import require_auth
+from ..auth import current_user_id, require_auth
+from . import resolve_service
 
 
 bp = Blueprint("search", __name__)
 
+# Resolved lazily via resolve_service so importing the blueprint does not
+# load the embedding models; kept as a module attribute so tests can patch it.
+search_rag_with_images = None
+
+
+def _get_search_service():
+    return resolve_service(__name__, "search_rag_with_images", "..services.search")
+
 
 @bp.route("/search", methods=["POST"])
 @require_auth
@@ -21,8 +29,7 @@ def search():
         if top_k < 1 or top_k > 50:
             return jsonify({"error": "top_k must be between 1 and 50"}), 400
 
-        user_id = g.current_user["id"] if isinstance(g.current_user, dict) else g.current_user.get("id")
-        response_payload = search_rag_with_images(query, top_k, owner_user_id=int(user_id))
+        response_payload = _get_search_service()(query, top_k, owner_user_id=current_user_id())
         response_payload.update(
             {
                 "query": query,
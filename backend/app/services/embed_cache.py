@@ -0,0 +1,70 @@
+"""Disk-backed embedding cache keyed by content hash.
+
+Replacing a document recomputes every embedding even when most chunks are
+unchanged. This module persists float32 vectors in a small SQLite database
+(WAL mode, one table) so unchanged content skips the model entirely across
+process restarts. Failures are swallowed: the cache must never break
+ingest, only speed it up. Disabled under TESTING and when EMBED_CACHE_DIR
+is empty.
+"""
+import os
+import sqlite3
+import threading
+from typing import Optional
+
+import numpy as np
+
+from ..config import Config
+
+_conn: Optional[sqlite3.Connection] = None
+_lock = threading.Lock()
+_DISABLED = os.getenv("TESTING") == "true" or not Config.EMBED_CACHE_DIR
+
+
+def _get_conn() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        os.makedirs(Config.EMBED_CACHE_DIR, exist_ok=True)
+        _conn = sqlite3.connect(
+            os.path.join(Config.EMBED_CACHE_DIR, "embeddings.sqlite3"),
+            check_same_thread=False,
+        )
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, data BLOB NOT NULL)"
+        )
+        _conn.execute("PRAGMA journal_mode=WAL;")
+        _conn.commit()
+    return _conn
+
+
+def get(key: str) -> Optional[np.ndarray]:
+    """Return the cached float32 vector for a content key, or None."""
+    if _DISABLED:
+        return None
+    try:
+        with _lock:
+            row = _get_conn().execute(
+                "SELECT data FROM embeddings WHERE key = ?", (key,)
+            ).fetchone()
+    except sqlite3.Error:
+        return None
+    if row is None:
+        return None
+    return np.frombuffer(row[0], dtype=np.float32)
+
+
+def put(key: str, arr) -> None:
+    """Persist a float32 vector under a content key."""
+    if _DISABLED:
+        return
+    try:
+        data = np.asarray(arr, dtype=np.float32).tobytes()
+        with _lock:
+            conn = _get_conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO embeddings (key, data) VALUES (?, ?)",
+                (key, data),
+            )
+            conn.commit()
+    except sqlite3.Error:
+        pass
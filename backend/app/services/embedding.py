@@ -1,37 +1,139 @@
 import base64
+import hashlib
 import io
+import threading
 from typing import Any, Dict, List, Optional
 
-import torch
+import numpy as np
+from cachetools import LRUCache
 from PIL import Image
-from sentence_transformers import SentenceTransformer
-from transformers import CLIPProcessor, CLIPModel
 
 from ..config import Config
-from ..repository.rag_repository import insert_chunk
-
-
-# Model loading (singleton per process)
-# Text model
-try:
-    text_model = SentenceTransformer(Config.TEXT_EMBEDDING_MODEL)
-except Exception as e:
-    raise RuntimeError(
-        f"Failed to load text embedding model '{Config.TEXT_EMBEDDING_MODEL}': {e}. "
-        f"Please check the model identifier is correct on Hugging Face."
-    ) from e
-
-# Image model (CLIP)
-try:
-    clip_model = CLIPModel.from_pretrained(Config.IMAGE_EMBEDDING_MODEL)
-    clip_processor = CLIPProcessor.from_pretrained(Config.IMAGE_EMBEDDING_MODEL)
-except Exception as e:
-    raise RuntimeError(
-        f"Failed to load image embedding model '{Config.IMAGE_EMBEDDING_MODEL}': {e}. "
-        f"Please check the model identifier is correct on Hugging Face. "
-        f"Alternative: try 'openai/clip-vit-large-patch14' (768 dimensions) or "
-        f"'laion/CLIP-ViT-H-14-laion2B-s32B-b79K' (1024 dimensions)."
-    ) from e
+from ..repository.rag_repository import insert_chunk, insert_chunks_bulk
+from . import embed_cache
+
+
+# Model singletons (one per process), loaded lazily on first use so that
+# importing this module does not pull torch/transformers into the startup
+# path. Kept as module attributes so tests can patch them directly.
+text_model = None
+clip_model = None
+clip_processor = None
+
+# Where the CLIP model actually lives; set when the model is loaded.
+_clip_device = "cpu"
+
+# GPU-side CLIP preprocessing (torchvision v2 on tensors): a (geometry,
+# batched) pair of pipelines, built when the model lands on a GPU, None on
+# CPU or when torchvision is missing. Geometry (Resize/CenterCrop) must run
+# per image — PDF page images come in assorted sizes — while ToDtype and
+# Normalize operate on the stacked fixed-size batch.
+_clip_gpu_preprocess = None
+
+# Re-ingestion and boilerplate paragraphs repeat identical strings; caching
+# their embeddings skips the encoder forward entirely. Keyed by (model,
+# sha1(text)) so a different model instance never serves stale vectors.
+_TEXT_EMBED_CACHE: LRUCache = LRUCache(maxsize=Config.TEXT_EMBED_CACHE_MAX)
+_text_embed_cache_lock = threading.Lock()
+
+
+def _text_cache_key(model, text: str):
+    return (model, hashlib.sha1(text.encode("utf-8")).digest())
+
+
+def _get_text_model():
+    """Load the text embedding model on first use (singleton per process)."""
+    global text_model
+    if text_model is None:
+        from sentence_transformers import SentenceTransformer
+
+        try:
+            text_model = SentenceTransformer(Config.TEXT_EMBEDDING_MODEL)
+        except Exception as e:
+            raise RuntimeError(
+                f"Failed to load text embedding model '{Config.TEXT_EMBEDDING_MODEL}': {e}. "
+                f"Please check the model identifier is correct on Hugging Face."
+            ) from e
+        try:
+            import torch
+
+            if torch.cuda.is_available():
+                # FP16 halves the bytes every matmul moves; encode() returns
+                # float32 numpy arrays regardless.
+                text_model = text_model.half().to("cuda")
+            else:
+                # TF32/oneDNN matmuls where the hardware supports them
+                torch.set_float32_matmul_precision("high")
+            if Config.USE_TORCH_COMPILE:
+                # Compile the underlying transformer; the sentence-transformers
+                # wrapper itself is thin Python and not worth capturing.
+                text_model[0].auto_model = torch.compile(
+                    text_model[0].auto_model, mode="reduce-overhead", fullgraph=False
+                )
+        except Exception as e:
+            print(f"⚠️ Reduced-precision setup unavailable for text model: {e}")
+    return text_model
+
+
+def _build_gpu_preprocess(image_processor):
+    """Build the (geometry, batched) torchvision v2 pipelines for CLIP.
+
+    Returns a per-image Resize/CenterCrop compose and a batched
+    ToDtype/Normalize compose, configured from the HF image processor.
+    """
+    import torch
+    from torchvision.transforms import v2
+
+    geometry = v2.Compose([
+        v2.Resize(image_processor.size["shortest_edge"], antialias=True),
+        v2.CenterCrop(image_processor.crop_size["height"]),
+    ])
+    batched = v2.Compose([
+        v2.ToDtype(torch.float32, scale=True),
+        v2.Normalize(mean=image_processor.image_mean, std=image_processor.image_std),
+    ])
+    return geometry, batched
+
+
+def _get_clip():
+    """Load the CLIP model/processor on first use (singleton per process).
+
+    The model is placed on the GPU in half precision when one is available;
+    FP16 halves the bytes moved per forward and runs on tensor cores.
+    """
+    global clip_model, clip_processor, _clip_device, _clip_gpu_preprocess
+    if clip_model is None or clip_processor is None:
+        import torch
+        from transformers import CLIPProcessor, CLIPModel
+
+        try:
+            clip_model = CLIPModel.from_pretrained(Config.IMAGE_EMBEDDING_MODEL)
+            clip_processor = CLIPProcessor.from_pretrained(Config.IMAGE_EMBEDDING_MODEL)
+        except Exception as e:
+            raise RuntimeError(
+                f"Failed to load image embedding model '{Config.IMAGE_EMBEDDING_MODEL}': {e}. "
+                f"Please check the model identifier is correct on Hugging Face. "
+                f"Alternative: try 'openai/clip-vit-large-patch14' (768 dimensions) or "
+                f"'laion/CLIP-ViT-H-14-laion2B-s32B-b79K' (1024 dimensions)."
+            ) from e
+        _clip_device = "cuda" if torch.cuda.is_available() else "cpu"
+        clip_model = clip_model.eval().to(_clip_device)
+        if _clip_device == "cuda":
+            clip_model = clip_model.half()
+        if _clip_device != "cpu":
+            # Resize/normalize on the GPU: the host then ships uint8 pixels
+            # (a quarter of the float32 bytes) and the CPU-bound PIL resize
+            # drops out of the hot path. Falls back to the HF processor.
+            try:
+                _clip_gpu_preprocess = _build_gpu_preprocess(clip_processor.image_processor)
+            except Exception as e:
+                print(f"⚠️ torchvision v2 preprocessing unavailable, using HF processor: {e}")
+        if Config.USE_TORCH_COMPILE:
+            try:
+                clip_model = torch.compile(clip_model, mode="reduce-overhead", fullgraph=False)
+            except Exception as e:
+                print(f"⚠️ torch.compile unavailable for CLIP model: {e}")
+    return clip_model, clip_processor
 
 
 def embed_text(
@@ -42,17 +144,32 @@ def embed_text(
     page_number: int,
     chunk_index: int,
     metadata: Optional[Dict[str, Any]] = None,
+    commit: bool = True,
 ) -> int:
     """Embed text, store chunk, and return its id."""
-    embedding: List[float] = text_model.encode(text).tolist()
-    
+    model = _get_text_model()
+    cache_key = _text_cache_key(model, text)
+    with _text_embed_cache_lock:
+        cached = _TEXT_EMBED_CACHE.get(cache_key)
+    if cached is None:
+        cached = embed_cache.get("text:" + cache_key[1].hex())
+    if cached is not None:
+        embedding: List[float] = cached.tolist()
+    else:
+        embedding = np.asarray(model.encode(text), dtype=np.float32).tolist()
+
     # Validate embedding dimension
     if len(embedding) != Config.TEXT_EMBEDDING_DIM:
         raise ValueError(
             f"Text embedding dimension mismatch: expected {Config.TEXT_EMBEDDING_DIM}, "
             f"got {len(embedding)}"
         )
-    
+    if cached is None:
+        vector = np.asarray(embedding, dtype=np.float32)
+        with _text_embed_cache_lock:
+            _TEXT_EMBED_CACHE[cache_key] = vector
+        embed_cache.put("text:" + cache_key[1].hex(), vector)
+
     metadata_with_dims = (metadata or {}).copy()
     metadata_with_dims.update({
         "type": "text",
@@ -71,52 +188,303 @@ def embed_text(
         image_embedding=None,
         image_base64=None,
         metadata=metadata_with_dims,
+        commit=commit,
     )
 
 
-def _decode_pdf_image_stream(stream_data: bytes, image_name: str) -> Optional[Image.Image]:
+def _encode_texts_cached(model, texts: List[str]) -> np.ndarray:
+    """Encode texts as an NxD float32 array, serving repeats from the LRU.
+
+    Only cache misses (deduplicated) go through the model; hits and misses
+    are reassembled in input order.
     """
-    Attempt to decode PDF image stream data using multiple methods.
-    PDF images can be in various formats (JPX, CCITT, DCT, etc.)
+    keys = [_text_cache_key(model, text) for text in texts]
+    with _text_embed_cache_lock:
+        cached = [_TEXT_EMBED_CACHE.get(key) for key in keys]
+
+    # Second tier: the persistent content-hash cache survives restarts
+    for position, (key, hit) in enumerate(zip(keys, cached)):
+        if hit is None:
+            disk = embed_cache.get("text:" + key[1].hex())
+            if disk is not None:
+                cached[position] = disk
+                with _text_embed_cache_lock:
+                    _TEXT_EMBED_CACHE[key] = disk
+
+    miss_positions: Dict[Any, int] = {}
+    miss_texts: List[str] = []
+    for key, hit, text in zip(keys, cached, texts):
+        if hit is None and key not in miss_positions:
+            miss_positions[key] = len(miss_texts)
+            miss_texts.append(text)
+
+    if miss_texts:
+        encoded = np.asarray(
+            model.encode(
+                miss_texts,
+                batch_size=64,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+            ),
+            dtype=np.float32,
+        )
+        if encoded.ndim == 1:
+            encoded = encoded.reshape(1, -1)
+        with _text_embed_cache_lock:
+            for key, position in miss_positions.items():
+                _TEXT_EMBED_CACHE[key] = encoded[position]
+        for key, position in miss_positions.items():
+            embed_cache.put("text:" + key[1].hex(), encoded[position])
+        cached = [
+            hit if hit is not None else encoded[miss_positions[key]]
+            for key, hit in zip(keys, cached)
+        ]
+    return np.stack(cached)
+
+
+def embed_texts_bulk(
+    conn,
+    texts: List[str],
+    *,
+    document_id: int,
+    page_number: int,
+    start_chunk_index: int = 1,
+    metadatas: Optional[List[Dict[str, Any]]] = None,
+    commit: bool = True,
+) -> List[int]:
+    """Embed many texts in one encoder call and store them in one batch.
+
+    A single encode(list, batch_size=...) amortizes tokenizer and forward
+    overhead across the page's chunks instead of paying it per string; the
+    rows then go through insert_chunks_bulk as one round-trip.
+    Returns the new chunk ids in input order.
     """
-    # Method 1: Try direct Pillow opening (works for standard formats)
-    try:
-        img = Image.open(io.BytesIO(stream_data))
-        return img.convert("RGB")
-    except Exception:
-        pass
-    
-    # Method 2: Try with explicit format hints
-    formats_to_try = ["PNG", "JPEG", "TIFF", "BMP", "GIF"]
-    for fmt in formats_to_try:
-        try:
-            img = Image.open(io.BytesIO(stream_data))
-            if img.format == fmt or fmt in str(img.format):
-                return img.convert("RGB")
-        except Exception:
-            continue
-    
-    # Method 3: Try reading as raw bytes and reconstructing
-    # Some PDF images are stored with filters that need decoding
+    if not texts:
+        return []
+    embeddings = _encode_texts_cached(_get_text_model(), list(texts))
+
+    # Validate embedding dimension
+    if embeddings.shape[1] != Config.TEXT_EMBEDDING_DIM:
+        raise ValueError(
+            f"Text embedding dimension mismatch: expected {Config.TEXT_EMBEDDING_DIM}, "
+            f"got {embeddings.shape[1]}"
+        )
+
+    rows: List[Dict[str, Any]] = []
+    for offset, text in enumerate(texts):
+        metadata_with_dims = ((metadatas[offset] if metadatas else None) or {}).copy()
+        metadata_with_dims.update({
+            "type": "text",
+            "embedding_dim": Config.TEXT_EMBEDDING_DIM,
+            "model": Config.TEXT_EMBEDDING_MODEL,
+        })
+        rows.append(
+            {
+                "document_id": document_id,
+                "chunk_type": "text",
+                "page_number": page_number,
+                "chunk_index": start_chunk_index + offset,
+                "content": text,
+                "text_embedding": embeddings[offset].tolist(),
+                "image_embedding": None,
+                "image_base64": None,
+                "metadata": metadata_with_dims,
+            }
+        )
+    return insert_chunks_bulk(conn, rows, commit=commit)
+
+
+# Magic-byte signatures for the image formats PDF streams commonly carry.
+_MAGIC_FORMATS = (
+    (b"\x89PNG", "PNG"),
+    (b"\xff\xd8", "JPEG"),
+    (b"GIF8", "GIF"),
+    (b"BM", "BMP"),
+    (b"II*\x00", "TIFF"),
+    (b"MM\x00*", "TIFF"),
+    (b"RIFF", "WEBP"),
+)
+
+
+def _sniff_image_format(stream_data: bytes) -> Optional[str]:
+    """Identify a standard image format from its magic bytes, or None."""
+    for magic, fmt in _MAGIC_FORMATS:
+        if stream_data.startswith(magic):
+            return fmt
+    return None
+
+
+def _decode_pdf_image_stream(stream_data: bytes, image_name: str) -> Optional[Image.Image]:
+    """Decode a PDF image stream with a single Pillow open.
+
+    The magic bytes identify standard formats up front so Pillow skips its
+    plugin scan; unknown magic (JPX, CCITT and other PDF-specific
+    encodings) still gets one unrestricted attempt, since Pillow may have
+    plugin support for it.
+    """
+    fmt = _sniff_image_format(stream_data)
     try:
-        # Check if it's a valid image by trying to detect format
-        img = Image.open(io.BytesIO(stream_data))
-        # Force format detection
-        img.load()  # Load the image to force format detection
+        img = Image.open(io.BytesIO(stream_data), formats=[fmt] if fmt else None)
         return img.convert("RGB")
     except Exception:
-        pass
-    
-    # Method 4: Try with pdf2image or pypdfium2 if available
-    # This is a fallback for complex PDF image formats
+        return None
+
+
+def _decode_and_prepare(stream_data: bytes, image_name: str) -> Optional[Image.Image]:
+    """Decode a PDF image stream into a validated RGB PIL image, or None."""
+    if not stream_data or len(stream_data) == 0:
+        print(f"⚠️ Empty stream data for {image_name}")
+        return None
+
+    img = _decode_pdf_image_stream(stream_data, image_name)
+    if img is None:
+        print(f"⚠️ Could not decode image {image_name}")
+        print(f"   Stream data length: {len(stream_data)} bytes")
+        print(f"   First 50 bytes (hex): {stream_data[:50].hex()}")
+        return None
+
+    # Validate image dimensions
+    if img.size[0] == 0 or img.size[1] == 0:
+        print(f"⚠️ Invalid image dimensions for {image_name}: {img.size}")
+        return None
+
+    # Convert to RGB if not already
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    return img
+
+
+def embed_images_batch(
+    conn,
+    prepared: List[Dict[str, Any]],
+    *,
+    document_id: int,
+    commit: bool = True,
+) -> List[str]:
+    """Embed a batch of decoded images in one CLIP forward pass.
+
+    Each prepared entry carries an 'image' (RGB PIL image) plus the
+    per-chunk fields (image_name, page_number, chunk_index, linked_chunk_id,
+    metadata). Preprocessing and the forward pass run once for the whole
+    batch, amortizing the per-image Python and kernel-launch overhead.
+    Returns the base64 payloads of the stored images.
+    """
+    if not prepared:
+        return []
     try:
-        import pdf2image
-        # This won't work directly with stream_data, but we can try
-        # For now, skip this method as it requires the full PDF
-    except ImportError:
-        pass
-    
-    return None
+        # Persistent cache first: unchanged images skip the forward (and
+        # with a full hit, the torch import) entirely.
+        image_keys = [
+            "img:" + hashlib.sha1(item["image"].tobytes()).hexdigest() for item in prepared
+        ]
+        embeddings: List[Optional[Any]] = [embed_cache.get(key) for key in image_keys]
+        miss_positions = [
+            position for position, vec in enumerate(embeddings) if vec is None
+        ]
+
+        if miss_positions:
+            import torch
+
+            model, processor = _get_clip()
+            images = [prepared[position]["image"] for position in miss_positions]
+            if _clip_device != "cpu" and _clip_gpu_preprocess is not None:
+                # Ship the raw uint8 pixels and resize/normalize on the GPU;
+                # pinned memory makes the non_blocking copy a true async DMA.
+                # Geometry runs per image — page images come in assorted
+                # sizes, so only its fixed-size outputs can be stacked.
+                geometry, batched_preprocess = _clip_gpu_preprocess
+                resized = [
+                    geometry(
+                        torch.from_numpy(np.asarray(image, dtype=np.uint8))
+                        .permute(2, 0, 1)
+                        .pin_memory()
+                        .to(_clip_device, non_blocking=True)
+                    )
+                    for image in images
+                ]
+                inputs = {"pixel_values": batched_preprocess(torch.stack(resized))}
+            else:
+                inputs = processor(images=images, return_tensors="pt")
+                if _clip_device != "cpu":
+                    # Staging through pinned memory makes the non_blocking copy
+                    # a true async DMA, overlapping H2D with the prior forward.
+                    inputs = {
+                        k: v.pin_memory().to(_clip_device, non_blocking=True)
+                        for k, v in inputs.items()
+                    }
+            # inference_mode skips autograd view/version tracking entirely;
+            # on GPU the forward runs in FP16 and is cast back for storage.
+            with torch.inference_mode():
+                if _clip_device == "cuda":
+                    with torch.autocast("cuda", dtype=torch.float16):
+                        outputs = model.get_image_features(**inputs)
+                    outputs = outputs.float()
+                else:
+                    outputs = model.get_image_features(**inputs)
+            for output_index, position in enumerate(miss_positions):
+                vector = outputs[output_index].cpu().numpy()
+                embeddings[position] = vector
+                embed_cache.put(image_keys[position], vector)
+
+        stored: List[str] = []
+        for position, item in enumerate(prepared):
+            img = item["image"]
+            image_name = item["image_name"]
+            embedding = embeddings[position].tolist()
+
+            # Validate embedding dimension
+            if len(embedding) != Config.IMAGE_EMBEDDING_DIM:
+                raise ValueError(
+                    f"Image embedding dimension mismatch: expected {Config.IMAGE_EMBEDDING_DIM}, "
+                    f"got {len(embedding)}"
+                )
+
+            # Keep the original bytes when the source is already a
+            # browser-displayable format; only transcode PDF-specific
+            # encodings (JPX, CCITT, ...), and to JPEG rather than the
+            # heavier DEFLATE round-trip of PNG.
+            stream_data = item.get("stream_data")
+            source_format = _sniff_image_format(stream_data) if stream_data else None
+            if source_format in ("JPEG", "PNG", "GIF", "WEBP"):
+                image_base64 = base64.b64encode(stream_data).decode("utf-8")
+            else:
+                buffered = io.BytesIO()
+                img.save(buffered, format="JPEG", quality=85)
+                image_base64 = base64.b64encode(buffered.getvalue()).decode("utf-8")
+                source_format = "JPEG"
+
+            metadata_with_dims = (item.get("metadata") or {}).copy()
+            metadata_with_dims.update({
+                "type": "image",
+                "source": image_name,
+                "embedding_dim": Config.IMAGE_EMBEDDING_DIM,
+                "model": Config.IMAGE_EMBEDDING_MODEL,
+                "normalized": True,
+                "image_format": source_format,
+                "image_size": f"{img.size[0]}x{img.size[1]}",
+            })
+
+            insert_chunk(
+                conn,
+                document_id=document_id,
+                chunk_type="image",
+                page_number=item["page_number"],
+                chunk_index=item["chunk_index"],
+                content=None,
+                text_embedding=None,
+                image_embedding=embedding,
+                image_base64=image_base64,
+                metadata=metadata_with_dims,
+                linked_chunk_id=item.get("linked_chunk_id"),
+                commit=commit,
+            )
+            stored.append(image_base64)
+        return stored
+    except Exception as e:
+        print(f"❌ Error embedding image batch ({len(prepared)} images): {e}")
+        import traceback
+        traceback.print_exc()
+        return []
 
 
 def embed_image_from_stream(
@@ -129,84 +497,30 @@ def embed_image_from_stream(
     chunk_index: int,
     linked_chunk_id: Optional[int],
     metadata: Optional[Dict[str, Any]] = None,
+    commit: bool = True,
 ) -> Optional[str]:
-    """Embed an image stream via CLIP and store base64 + embedding."""
+    """Embed a single image stream via CLIP (batch of one)."""
     try:
-        # Validate stream data
-        if not stream_data or len(stream_data) == 0:
-            print(f"⚠️ Empty stream data for {image_name}")
-            return None
-        
-        # Try to decode the image using multiple methods
-        img = _decode_pdf_image_stream(stream_data, image_name)
-        
+        img = _decode_and_prepare(stream_data, image_name)
         if img is None:
-            # Last resort: try to save and reload (sometimes helps with format issues)
-            try:
-                temp_buffer = io.BytesIO()
-                # Try saving as PNG first
-                temp_img = Image.new("RGB", (100, 100), color="white")
-                temp_img.save(temp_buffer, format="PNG")
-                # If that worked, try the original data again with different approach
-                img = Image.open(io.BytesIO(stream_data))
-                img = img.convert("RGB")
-            except Exception as e:
-                print(f"⚠️ Could not decode image {image_name}: {e}")
-                print(f"   Stream data length: {len(stream_data)} bytes")
-                print(f"   First 50 bytes (hex): {stream_data[:50].hex()}")
-                return None
-        
-        # Validate image dimensions
-        if img.size[0] == 0 or img.size[1] == 0:
-            print(f"⚠️ Invalid image dimensions for {image_name}: {img.size}")
             return None
-        
-        # Convert to RGB if not already
-        if img.mode != "RGB":
-            img = img.convert("RGB")
-        
-        # Save to buffer for base64 encoding
-        buffered = io.BytesIO()
-        img.save(buffered, format="PNG")
-        image_base64 = base64.b64encode(buffered.getvalue()).decode("utf-8")
-
-        # Generate CLIP embedding
-        inputs = clip_processor(images=img, return_tensors="pt")
-        with torch.no_grad():
-            outputs = clip_model.get_image_features(**inputs)
-        embedding = outputs[0].cpu().numpy().tolist()
-        
-        # Validate embedding dimension
-        if len(embedding) != Config.IMAGE_EMBEDDING_DIM:
-            raise ValueError(
-                f"Image embedding dimension mismatch: expected {Config.IMAGE_EMBEDDING_DIM}, "
-                f"got {len(embedding)}"
-            )
-        
-        metadata_with_dims = (metadata or {}).copy()
-        metadata_with_dims.update({
-            "type": "image",
-            "source": image_name,
-            "embedding_dim": Config.IMAGE_EMBEDDING_DIM,
-            "model": Config.IMAGE_EMBEDDING_MODEL,
-            "image_format": img.format or "unknown",
-            "image_size": f"{img.size[0]}x{img.size[1]}",
-        })
-
-        insert_chunk(
+        stored = embed_images_batch(
             conn,
+            [
+                {
+                    "image": img,
+                    "stream_data": stream_data,
+                    "image_name": image_name,
+                    "page_number": page_number,
+                    "chunk_index": chunk_index,
+                    "linked_chunk_id": linked_chunk_id,
+                    "metadata": metadata,
+                }
+            ],
             document_id=document_id,
-            chunk_type="image",
-            page_number=page_number,
-            chunk_index=chunk_index,
-            content=None,
-            text_embedding=None,
-            image_embedding=embedding,
-            image_base64=image_base64,
-            metadata=metadata_with_dims,
-            linked_chunk_id=linked_chunk_id,
+            commit=commit,
         )
-        return image_base64
+        return stored[0] if stored else None
     except Exception as e:
         print(f"❌ Error embedding image {image_name}: {e}")
         import traceback
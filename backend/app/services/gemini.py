@@ -1,5 +1,6 @@
 import json
 import logging
+import re
 from typing import Any, Dict, List
 
 try:
@@ -7,10 +8,44 @@ try:
 except ImportError:  # pragma: no cover - optional dependency
     genai = None
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
 from ..config import Config
 
 logger = logging.getLogger(__name__)
 
+# One compiled regex extracts a fenced JSON block in a single pass instead of
+# the repeated str.find scans; orjson parses the payload several times faster
+# than stdlib json when it is installed.
+_FENCE = re.compile(r"```(?:json)?\s*(\{.*\})\s*```", re.S)
+_loads = orjson.loads if orjson is not None else json.loads
+
+# The static instruction text is hoisted out of _build_prompt and sent as the
+# model's system instruction: per-request prompts carry only the dynamic
+# context, and the API can cache the shared instruction prefix across calls
+# instead of re-tokenizing the boilerplate every time.
+_SYSTEM_INSTRUCTION = """You are an enterprise RAG assistant. Use only the provided context segments to answer the question.
+
+Instructions:
+- Use only the information from the context segments
+- Return a JSON object with this exact structure:
+{
+  "answer": "<overall response based on the context>",
+  "sections": [
+    {
+      "title": "<short heading for this section>",
+      "chunk_ids": [<chunk_id_numbers_as_integers>],
+      "text": "<detailed explanation using the referenced chunks>"
+    }
+  ]
+}
+- Only reference chunk_ids that appear in the context segments
+- If information is missing, state that explicitly
+- Ensure the JSON is valid and properly formatted"""
+
 
 class GeminiClient:
     """Wrapper around Gemini to keep prompting logic centralized."""
@@ -26,6 +61,7 @@ class GeminiClient:
             genai.configure(api_key=Config.GEMINI_API_KEY)
             self.model = genai.GenerativeModel(
                 model_name=Config.GEMINI_MODEL,
+                system_instruction=_SYSTEM_INSTRUCTION,
                 generation_config={
                     "temperature": 0.25,
                     "top_p": 0.9,
@@ -35,41 +71,21 @@ class GeminiClient:
             )
 
     def _build_prompt(self, question: str, segments: List[Dict[str, Any]]) -> str:
-        """Create structured text prompt for Gemini."""
+        """Create the dynamic (context + question) part of the prompt.
+
+        The instruction boilerplate lives in _SYSTEM_INSTRUCTION and is
+        attached to the model itself, so it is not rebuilt here per call.
+        """
         context_parts = []
         for seg in segments:
             chunk_info = f"[Chunk ID: {seg['chunk_id']}, Page: {seg.get('page_number', 'N/A')}]"
             content = seg.get("content", "").strip()
             if content:
                 context_parts.append(f"{chunk_info}\n{content}")
-        
-        context_text = "\n\n---\n\n".join(context_parts)
-        
-        prompt = f"""You are an enterprise RAG assistant. Use only the provided context segments to answer the question.
 
-Context segments:
-{context_text}
+        context_text = "\n\n---\n\n".join(context_parts)
 
-Question: {question}
-
-Instructions:
-- Use only the information from the context segments above
-- Return a JSON object with this exact structure:
-{{
-  "answer": "<overall response based on the context>",
-  "sections": [
-    {{
-      "title": "<short heading for this section>",
-      "chunk_ids": [<chunk_id_numbers_as_integers>],
-      "text": "<detailed explanation using the referenced chunks>"
-    }}
-  ]
-}}
-- Only reference chunk_ids that appear in the context segments
-- If information is missing, state that explicitly
-- Ensure the JSON is valid and properly formatted"""
-        
-        return prompt
+        return f"Context segments:\n{context_text}\n\nQuestion: {question}"
 
     def generate(self, question: str, segments: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Invoke Gemini and return parsed JSON response or fallback."""
@@ -115,19 +131,12 @@ Instructions:
             
             logger.debug(f"Gemini response length: {len(raw_text)}")
             
-            # Try to extract JSON from response if it's wrapped in markdown code blocks
-            if "```json" in raw_text:
-                start = raw_text.find("```json") + 7
-                end = raw_text.find("```", start)
-                if end > start:
-                    raw_text = raw_text[start:end].strip()
-            elif "```" in raw_text:
-                start = raw_text.find("```") + 3
-                end = raw_text.find("```", start)
-                if end > start:
-                    raw_text = raw_text[start:end].strip()
-            
-            data = json.loads(raw_text)
+            # Extract JSON from a markdown code fence, if the model added one
+            fence_match = _FENCE.search(raw_text)
+            if fence_match:
+                raw_text = fence_match.group(1)
+
+            data = _loads(raw_text)
             
             # Validate response structure
             if not isinstance(data, dict):
@@ -143,7 +152,7 @@ Instructions:
             logger.info("Successfully generated Gemini response")
             return data
             
-        except json.JSONDecodeError as e:
+        except ValueError as e:  # json.JSONDecodeError / orjson.JSONDecodeError
             logger.error(f"Failed to parse Gemini JSON response: {e}")
             if raw_text:
                 logger.error(f"Response text (first 500 chars): {raw_text[:500]}")
@@ -1,10 +1,14 @@
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+
 import pdfplumber
-from typing import Dict, List, Optional
 
 from ..config import Config
-from ..db import connect_db
+from ..db import get_conn
 from ..repository.rag_repository import insert_document, update_document_metadata
-from .embedding import embed_image_from_stream, embed_text
 
 
 def chunk_text(text: str, chunk_size: Optional[int] = None, overlap: Optional[int] = None) -> List[str]:
@@ -12,194 +16,197 @@ def chunk_text(text: str, chunk_size: Optional[int] = None, overlap: Optional[in
     chunk_size = chunk_size or Config.CHUNK_SIZE
     overlap = overlap or Config.CHUNK_OVERLAP
     words = text.split()
-    chunks: List[str] = []
-    i = 0
-    while i < len(words):
-        chunk = words[i : i + chunk_size]
-        chunks.append(" ".join(chunk))
-        i += max(chunk_size - overlap, 1)
-    return chunks
+    step = max(chunk_size - overlap, 1)
+    return [
+        " ".join(words[start : start + chunk_size])
+        for start in range(0, len(words), step)
+    ]
 
 
-def process_pdf(file_path: str, original_filename: str, owner_user_id: int, content_hash: str, document_id: int | None = None) -> Dict[str, int]:
-    """Process PDF, store embeddings, and return ingestion metadata."""
-    conn = connect_db()
-    print("✅ Connected to PostgreSQL database.")
-
-    if document_id is None:
-        document_id = insert_document(
-            conn,
-            filename=original_filename,
-            source_path=file_path,
-            owner_user_id=owner_user_id,
-            content_hash=content_hash,
-            metadata={"source": "pdf_upload"},
+def _iter_page_images(page):
+    """Yield (index, img_info, stream_data) for each unique image on a page.
+
+    page.images and page.objects["image"] are two views of the same
+    underlying XObjects, so both are walked and deduplicated by bounding
+    box. This replaces the old two-method fallback, which re-ran the whole
+    second pass whenever any single image failed in the first and stored
+    duplicate rows for the ones that had already succeeded.
+    """
+    seen_bboxes = set()
+    index = 0
+    for img_info in list(page.images) + list(page.objects.get("image", [])):
+        bbox = (
+            img_info.get("x0"),
+            img_info.get("y0"),
+            img_info.get("x1"),
+            img_info.get("y1"),
         )
-    else:
-        update_document_metadata(document_id, original_filename, file_path, content_hash, {"source": "pdf_replace"})
+        if all(coord is not None for coord in bbox):
+            if bbox in seen_bboxes:
+                continue
+            seen_bboxes.add(bbox)
+
+        stream = img_info.get("stream")
+        if stream is None:
+            continue
+        try:
+            if hasattr(stream, "get_data"):
+                stream_data = stream.get_data()
+            elif isinstance(stream, dict):
+                stream_data = stream.get("data", b"")
+                if isinstance(stream_data, str):
+                    stream_data = stream_data.encode()
+            else:
+                stream_data = bytes(stream)
+        except Exception as exc:
+            print(f"⚠️ Could not get stream data for image on page: {exc}")
+            continue
+        if not stream_data:
+            continue
+
+        index += 1
+        yield index, img_info, stream_data
+
 
-    text_chunk_count = 0
-    image_chunk_count = 0
+def _extract_page(
+    file_path: str, original_filename: str, page_num: int
+) -> Tuple[List[str], List[Dict]]:
+    """Extract one page's text chunks and decoded images.
+
+    Runs on a worker thread; each call opens its own pdfplumber handle since
+    pdfminer page objects share a file stream and are not thread-safe.
+    Returned image entries carry everything except linked_chunk_id, which
+    the consumer assigns once the page's text chunks have ids.
+    """
+    # Imported here so chunk_text stays importable without the embedding stack
+    from .embedding import _decode_and_prepare
 
     with pdfplumber.open(file_path) as pdf:
-        for page_num, page in enumerate(pdf.pages, start=1):
-            print(f"🔍 Processing page {page_num}...")
-            page_text_chunks = chunk_text(page.extract_text() or "")
-            last_text_chunk_id: Optional[int] = None
+        page = pdf.pages[page_num - 1]
+        print(f"🔍 Processing page {page_num}...")
+        page_text_chunks = chunk_text(page.extract_text() or "")
 
-            for idx, chunk in enumerate(page_text_chunks, start=1):
+        pending_images: List[Dict] = []
+        try:
+            for i, img_info, stream_data in _iter_page_images(page):
+                img_name = f"{original_filename}_page_{page_num}_img_{i}.png"
                 metadata = {
-                    "type": "text",
+                    "type": "image",
                     "page": page_num,
-                    "chunk": idx,
-                    "filename": original_filename,
+                    "image_width": img_info.get("width"),
+                    "image_height": img_info.get("height"),
+                    "x0": img_info.get("x0"),
+                    "y0": img_info.get("y0"),
+                    "x1": img_info.get("x1"),
+                    "y1": img_info.get("y1"),
+                    "filename": img_name,
                 }
-                last_text_chunk_id = embed_text(
+
+                img = _decode_and_prepare(stream_data, img_name)
+                if img is not None:
+                    pending_images.append(
+                        {
+                            "image": img,
+                            "stream_data": stream_data,
+                            "image_name": img_name,
+                            "page_number": page_num,
+                            "chunk_index": i,
+                            "metadata": metadata,
+                        }
+                    )
+        except Exception as exc:
+            print(f"⚠️ Failed to extract images from page {page_num}: {exc}")
+
+    return page_text_chunks, pending_images
+
+
+def process_pdf(file_path: str, original_filename: str, owner_user_id: int, content_hash: str, document_id: int | None = None) -> Dict[str, int]:
+    """Process PDF, store embeddings, and return ingestion metadata.
+
+    Page extraction (pdfminer parsing + PIL decode) runs on a worker pool
+    while the consumer embeds and writes the previous page, so extraction
+    overlaps the model forwards. The whole ingest still runs in one
+    transaction on a pooled connection: one WAL fsync per document.
+    """
+    # Imported here so chunk_text stays importable without the embedding stack
+    from .embedding import embed_images_batch, embed_texts_bulk
+
+    with pdfplumber.open(file_path) as pdf:
+        page_count = len(pdf.pages)
+
+    with get_conn() as conn:
+        try:
+            if document_id is None:
+                document_id = insert_document(
                     conn,
-                    chunk,
-                    document_id=document_id,
-                    page_number=page_num,
-                    chunk_index=idx,
-                    metadata=metadata,
+                    filename=original_filename,
+                    source_path=file_path,
+                    owner_user_id=owner_user_id,
+                    content_hash=content_hash,
+                    metadata={"source": "pdf_upload"},
+                    commit=False,
                 )
-                text_chunk_count += 1
-
-            # Try multiple methods to extract images from PDF
-            images_extracted = False
-            
-            # Method 1: Use pdfplumber's image extraction (handles decoding better)
-            try:
-                page_images = page.images
-                for i, img_info in enumerate(page_images, start=1):
-                    try:
-                        # Try to get the image using pdfplumber's method
-                        # This handles PDF filters and decoding automatically
-                        img_name = f"{original_filename}_page_{page_num}_img_{i}.png"
-                        
-                        # Get image stream - pdfplumber images dict may have stream or we need to access via objects
-                        stream = None
-                        stream_data = None
-                        
-                        # Try to get stream from image info
-                        if "stream" in img_info:
-                            stream = img_info["stream"]
-                        else:
-                            # Fallback: try to find stream in page objects
-                            img_objects = page.objects.get("image", [])
-                            if i <= len(img_objects):
-                                stream = img_objects[i - 1].get("stream")
-                        
-                        if stream is None:
-                            continue
-                        
-                        # Try to get decoded data
-                        try:
-                            if hasattr(stream, "get_data"):
-                                stream_data = stream.get_data()
-                            elif isinstance(stream, dict):
-                                stream_data = stream.get("data", b"")
-                                if isinstance(stream_data, str):
-                                    stream_data = stream_data.encode()
-                            else:
-                                stream_data = bytes(stream)
-                        except Exception as e:
-                            print(f"⚠️ Could not get stream data for {img_name}: {e}")
-                            continue
-                        
-                        if not stream_data or len(stream_data) == 0:
-                            continue
-                        
-                        metadata = {
-                            "type": "image",
+            else:
+                update_document_metadata(document_id, original_filename, file_path, content_hash, {"source": "pdf_replace"})
+
+            text_chunk_count = 0
+            image_chunk_count = 0
+
+            max_workers = max(1, min(8, os.cpu_count() or 1, page_count))
+            extract = partial(_extract_page, file_path, original_filename)
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                # Keep at most 2x max_workers pages in flight: workers stay
+                # busy while the consumer embeds, but peak memory is bounded
+                # by the window instead of every decoded page in the document
+                # (Executor.map buffers completed results without backpressure).
+                window = 2 * max_workers
+                in_flight: deque = deque(
+                    executor.submit(extract, page_num)
+                    for page_num in range(1, min(window, page_count) + 1)
+                )
+                next_page = len(in_flight) + 1
+                for page_num in range(1, page_count + 1):
+                    page_text_chunks, pending_images = in_flight.popleft().result()
+                    if next_page <= page_count:
+                        in_flight.append(executor.submit(extract, next_page))
+                        next_page += 1
+                    # One encoder call and one insert batch per page
+                    text_metadatas = [
+                        {
+                            "type": "text",
                             "page": page_num,
-                            "image_width": img_info.get("width"),
-                            "image_height": img_info.get("height"),
-                            "x0": img_info.get("x0"),
-                            "y0": img_info.get("y0"),
-                            "x1": img_info.get("x1"),
-                            "y1": img_info.get("y1"),
-                            "filename": img_name,
+                            "chunk": idx,
+                            "filename": original_filename,
                         }
-                        
-                        result = embed_image_from_stream(
-                            conn,
-                            stream_data,
-                            img_name,
-                            document_id=document_id,
-                            page_number=page_num,
-                            chunk_index=i,
-                            linked_chunk_id=last_text_chunk_id,
-                            metadata=metadata,
-                        )
-                        
-                        if result:
-                            image_chunk_count += 1
-                            images_extracted = True
-                    except Exception as exc:
-                        print(f"⚠️ Failed to extract image {i} on page {page_num}: {exc}")
-                        continue
-            except Exception as exc:
-                print(f"⚠️ Failed to extract images from page {page_num} using pdfplumber images: {exc}")
-            
-            # Method 2: Fallback to objects.get("image") if Method 1 didn't work
-            if not images_extracted:
-                try:
-                    for i, img_obj in enumerate(page.objects.get("image", []), start=1):
-                        try:
-                            stream = img_obj.get("stream")
-                            if stream is None:
-                                continue
-                            
-                            # Try multiple ways to get the stream data
-                            try:
-                                stream_data = stream.get_data()
-                            except Exception:
-                                try:
-                                    stream_data = bytes(stream.get("data", b""))
-                                except Exception:
-                                    # Try accessing raw stream
-                                    if hasattr(stream, "get_data"):
-                                        stream_data = stream.get_data()
-                                    else:
-                                        stream_data = bytes(stream)
-                            
-                            if not stream_data or len(stream_data) == 0:
-                                continue
-                            
-                            img_name = f"{original_filename}_page_{page_num}_img_{i}.png"
-                            metadata = {
-                                "type": "image",
-                                "page": page_num,
-                                "image_width": img_obj.get("width"),
-                                "image_height": img_obj.get("height"),
-                                "filename": img_name,
-                            }
-                            
-                            result = embed_image_from_stream(
-                                conn,
-                                stream_data,
-                                img_name,
-                                document_id=document_id,
-                                page_number=page_num,
-                                chunk_index=i,
-                                linked_chunk_id=last_text_chunk_id,
-                                metadata=metadata,
-                            )
-                            
-                            if result:
-                                image_chunk_count += 1
-                        except Exception as exc:
-                            print(f"⚠️ Failed to extract image {i} on page {page_num} (fallback method): {exc}")
-                            continue
-                except Exception as exc:
-                    print(f"⚠️ Failed to extract images from page {page_num} using objects method: {exc}")
-
-    conn.close()
-    print("🔒 Database connection closed.")
+                        for idx in range(1, len(page_text_chunks) + 1)
+                    ]
+                    text_chunk_ids = embed_texts_bulk(
+                        conn,
+                        page_text_chunks,
+                        document_id=document_id,
+                        page_number=page_num,
+                        start_chunk_index=1,
+                        metadatas=text_metadatas,
+                        commit=False,
+                    )
+                    text_chunk_count += len(text_chunk_ids)
+                    last_text_chunk_id = text_chunk_ids[-1] if text_chunk_ids else None
+
+                    # One CLIP forward pass for the whole page's images
+                    for item in pending_images:
+                        item["linked_chunk_id"] = last_text_chunk_id
+                    stored = embed_images_batch(
+                        conn, pending_images, document_id=document_id, commit=False
+                    )
+                    image_chunk_count += len(stored)
+
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
 
     return {
         "document_id": document_id,
         "text_chunks": text_chunk_count,
         "image_chunks": image_chunk_count,
     }
-
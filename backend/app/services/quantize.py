@@ -0,0 +1,45 @@
+"""Scalar quantization helpers for stored embeddings.
+
+Embeddings are stored as uint8 with a per-vector scale/zero-point
+(asymmetric min-max quantization): a quarter of the float32 footprint with
+sub-percent recall loss for retrieval workloads.
+"""
+from typing import Tuple
+
+import numpy as np
+
+
+def quantize_int8(vec) -> Tuple[bytes, float, float]:
+    """Quantize a float vector to uint8 bytes plus (scale, zero_point).
+
+    Reconstruction is `q * scale + zero_point`.
+    """
+    arr = np.asarray(vec, dtype=np.float32)
+    zero_point = float(arr.min())
+    scale = (float(arr.max()) - zero_point) / 255.0
+    if scale == 0.0:
+        scale = 1.0
+    quantized = np.clip(np.round((arr - zero_point) / scale), 0, 255).astype(np.uint8)
+    return quantized.tobytes(), scale, zero_point
+
+
+def dequantize_int8(data: bytes, scale: float, zero_point: float) -> np.ndarray:
+    """Reconstruct a float32 vector from quantize_int8 output."""
+    return np.frombuffer(data, dtype=np.uint8).astype(np.float32) * scale + zero_point
+
+
+# Per-byte popcount table; indexing it vectorizes Hamming distance in numpy.
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def binarize(vec) -> bytes:
+    """1-bit sign quantization: one bit per dimension, packed into bytes."""
+    arr = np.asarray(vec, dtype=np.float32)
+    return np.packbits((arr > 0).astype(np.uint8)).tobytes()
+
+
+def hamming_distance(a, b) -> int:
+    """Hamming distance between two binarize() outputs."""
+    xa = np.frombuffer(a, dtype=np.uint8)
+    xb = np.frombuffer(b, dtype=np.uint8)
+    return int(_POPCOUNT[np.bitwise_xor(xa, xb)].sum())
@@ -0,0 +1,76 @@
+"""Micro-batching for concurrent query encodes.
+
+Each /search request embeds its query as a batch of one, so under load the
+encoder runs many tiny forward passes back to back. This batcher lets
+concurrent requests share a forward: the first caller to arrive becomes the
+batch leader, waits up to MAX_WAIT_MS for others to join (or until the batch
+fills), then encodes everything in one call and hands each waiter its row.
+A lone request pays at most the wait budget; concurrent requests multiply
+throughput without it.
+
+Threaded rather than asyncio because the app serves sync Flask views from a
+WSGI worker pool — there is no event loop to schedule a flush task on.
+"""
+import threading
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+MAX_BATCH = 32
+MAX_WAIT_MS = 50
+
+
+class QueryBatcher:
+    def __init__(
+        self,
+        encode_fn: Callable[[List[str]], np.ndarray],
+        max_batch: int = MAX_BATCH,
+        max_wait_ms: int = MAX_WAIT_MS,
+    ):
+        self._encode = encode_fn
+        self._max_batch = max_batch
+        self._max_wait = max_wait_ms / 1000.0
+        self._cond = threading.Condition()
+        self._pending: List[Dict] = []
+        self._leader_active = False
+
+    def submit(self, text: str) -> np.ndarray:
+        """Encode one query, sharing the forward with concurrent callers."""
+        entry: Dict = {"text": text, "embedding": None, "error": None, "done": threading.Event()}
+        batch = None
+        with self._cond:
+            self._pending.append(entry)
+            if len(self._pending) >= self._max_batch:
+                self._cond.notify_all()
+            if not self._leader_active:
+                # First waiter leads: collect followers until the batch
+                # fills or the wait budget runs out, then take the batch.
+                self._leader_active = True
+                deadline = time.monotonic() + self._max_wait
+                while len(self._pending) < self._max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._pending
+                self._pending = []
+                self._leader_active = False
+        if batch is not None:
+            self._flush(batch)
+        entry["done"].wait()
+        if entry["error"] is not None:
+            raise entry["error"]
+        return entry["embedding"]
+
+    def _flush(self, batch: List[Dict]) -> None:
+        try:
+            vectors = self._encode([item["text"] for item in batch])
+            for item, vector in zip(batch, vectors):
+                item["embedding"] = vector
+        except Exception as exc:  # propagate to every waiter, not just the leader
+            for item in batch:
+                item["error"] = exc
+        finally:
+            for item in batch:
+                item["done"].set()
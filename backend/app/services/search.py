@@ -1,37 +1,174 @@
-import ast
+import hashlib
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Dict, List, Optional
 
 import numpy as np
-from sentence_transformers import SentenceTransformer
+from cachetools import LRUCache, TTLCache
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import simsimd
+except ImportError:  # pragma: no cover - optional dependency
+    simsimd = None
+
+try:
+    from numba import njit, prange
+except ImportError:  # pragma: no cover - optional dependency
+    njit = None
+
+_loads = orjson.loads if orjson is not None else json.loads
 
 from ..config import Config
 from ..repository.rag_repository import (
     fetch_documents_by_ids,
     fetch_images_for_text_chunks,
     fetch_text_chunks,
-    fetch_text_chunks_with_vector_search,
+    fetch_text_chunks_with_images,
 )
 from .gemini import gemini_client
+from .quantize import binarize, hamming_distance
+from .query_batcher import QueryBatcher
+from .vector_store import get_store
+
+# Resolved lazily on first search so importing this module does not pull
+# torch/sentence-transformers into the startup path. Kept as a module
+# attribute so tests can patch it; when unset, the process-wide encoder
+# from services.embedding is shared — one model copy (and one torch.compile
+# warm-up) per worker, not one per module.
+text_model = None
+
+
+def _get_text_model():
+    global text_model
+    if text_model is None:
+        from .embedding import _get_text_model as _get_shared_text_model
+
+        text_model = _get_shared_text_model()
+    return text_model
+
+
+def _encode_queries(texts: List[str]) -> np.ndarray:
+    """Encode a batch of query strings into a (N, dim) float32 array.
+
+    Queries are L2-normalized to match the stored vectors, so similarity
+    reduces to a dot product.
+    """
+    return np.atleast_2d(
+        np.asarray(
+            _get_text_model().encode(
+                texts,
+                batch_size=len(texts),
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+            ),
+            dtype=np.float32,
+        )
+    )
 
-text_model = SentenceTransformer(Config.TEXT_EMBEDDING_MODEL)
 
+# Concurrent /search requests share one encoder forward through this batcher
+query_batcher = QueryBatcher(_encode_queries)
 
-def parse_embedding(emb: Any) -> Optional[List[float]]:
+# Repeat queries are common in RAG UX; caching their embeddings skips the
+# encoder forward entirely. Keyed by (model, query) so a different model
+# instance never serves stale vectors.
+_QUERY_EMBED_CACHE: LRUCache = LRUCache(maxsize=1024)
+_query_embed_cache_lock = threading.Lock()
+
+# The Gemini call (network + prefill over the context) dominates end-to-end
+# search latency; an identical (query, chunk-set) pair reuses the parsed
+# response. Fallback responses are never cached — they flag transient errors.
+_LLM_CACHE: TTLCache = TTLCache(maxsize=512, ttl=3600)
+_llm_cache_lock = threading.Lock()
+
+# The image and document lookups are independent Postgres round-trips, so
+# they run side by side on this small pool (each worker gets its own pooled
+# connection).
+_FETCH_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="search-io")
+
+
+def invalidate_llm_cache() -> None:
+    """Drop all cached LLM responses (after chunk deletion/replacement)."""
+    with _llm_cache_lock:
+        _LLM_CACHE.clear()
+
+
+def _query_embedding(query: str) -> np.ndarray:
+    """Embed one query, serving exact repeats from an in-process LRU."""
+    cache_key = (_get_text_model(), query.strip())
+    with _query_embed_cache_lock:
+        cached = _QUERY_EMBED_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+    embedding = query_batcher.submit(query)
+    with _query_embed_cache_lock:
+        _QUERY_EMBED_CACHE[cache_key] = embedding
+    return embedding
+
+
+def parse_embedding(emb: Any) -> Optional[np.ndarray]:
+    """Parse a stored embedding into a float32 array.
+
+    Stored '[...]' strings are valid JSON, so the string branch uses orjson
+    (SIMD parser) instead of ast.literal_eval plus a per-element float()
+    loop; the numpy conversion skips Python-object floats entirely.
+    """
     if emb is None:
         return None
-    if isinstance(emb, list):
-        return emb
+    if isinstance(emb, (list, np.ndarray)):
+        return np.asarray(emb, dtype=np.float32)
     if isinstance(emb, str):
         try:
-            return [float(x) for x in ast.literal_eval(emb)]
+            return np.asarray(_loads(emb), dtype=np.float32)
         except Exception:
             return None
     return None
 
 
+if njit is not None:
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _rank_kernel(mat: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """Cosine similarities of each row of `mat` against a unit `query`.
+
+        Fuses the dot product and row norm into one pass per row and
+        parallelizes over rows with prange — the multi-core scaling numpy's
+        single GEMV does not get on this shape. Compilation happens on the
+        first call (not at import, which must stay cheap) and cache=True
+        persists the compiled kernel on disk across restarts.
+        """
+        out = np.empty(mat.shape[0], dtype=np.float32)
+        for i in prange(mat.shape[0]):
+            dot = np.float32(0.0)
+            norm_sq = np.float32(0.0)
+            for j in range(mat.shape[1]):
+                dot += mat[i, j] * query[j]
+                norm_sq += mat[i, j] * mat[i, j]
+            out[i] = dot / (np.sqrt(norm_sq) + np.float32(1e-12))
+        return out
+
+else:
+
+    def _rank_kernel(mat: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """Numpy fallback: normalize rows, then one GEMV against the query."""
+        norms = np.linalg.norm(mat, axis=1, keepdims=True) + 1e-12
+        return (mat / norms) @ query
+
+
 def cosine_similarity(a: List[float], b: List[float]) -> float:
-    va = np.array(a, dtype=np.float32)
-    vb = np.array(b, dtype=np.float32)
+    va = np.ascontiguousarray(a, dtype=np.float32)
+    vb = np.ascontiguousarray(b, dtype=np.float32)
+    if simsimd is not None:
+        # Single fused SIMD kernel: one pass over each vector instead of
+        # two norms plus a dot. simsimd returns cosine *distance*.
+        similarity = 1.0 - float(simsimd.cosine(va, vb))
+        return similarity if np.isfinite(similarity) else 0.0
     denom = float(np.linalg.norm(va) * np.linalg.norm(vb))
     if denom == 0:
         return 0.0
@@ -42,82 +179,187 @@ def _rank_chunks(query_embedding: List[float], top_k: int, owner_user_id: Option
     """Rank chunks by similarity, using pgvector if available, otherwise JSONB fallback."""
     if Config.USE_PGVECTOR:
         try:
-            # Use pgvector for efficient vector search
-            return fetch_text_chunks_with_vector_search(query_embedding, top_k, owner_user_id=owner_user_id)
+            # One fused query: vector hits plus their linked images
+            return fetch_text_chunks_with_images(query_embedding, top_k, owner_user_id=owner_user_id)
         except Exception as e:
             # Fallback to JSONB if pgvector fails
             import logging
             logger = logging.getLogger(__name__)
             logger.warning(f"pgvector search failed, falling back to JSONB: {e}")
     
-    # Fallback: JSONB-based similarity search
+    # Fallback: JSONB-based similarity search (needs the raw embeddings)
     candidate_pool_size = max(top_k * 20, Config.MAX_CONTEXT_CHUNKS * 5)
-    text_chunks = fetch_text_chunks(limit=candidate_pool_size, owner_user_id=owner_user_id)
-    scored: List[Dict[str, Any]] = []
+    text_chunks = fetch_text_chunks(limit=candidate_pool_size, owner_user_id=owner_user_id, include_embedding=True)
+
+    # Cheap first stage: Hamming distance on the 1-bit embeddings narrows
+    # the pool before exact cosine re-ranking. Chunks without stored bits
+    # (pre-migration rows) go straight to the exact stage.
+    prefilter_size = top_k * 10
+    with_bits = [chunk for chunk in text_chunks if chunk.get("embedding_bits")]
+    if len(with_bits) > prefilter_size:
+        query_bits = binarize(query_embedding)
+        with_bits.sort(key=lambda chunk: hamming_distance(query_bits, chunk["embedding_bits"]))
+        text_chunks = with_bits[:prefilter_size] + [
+            chunk for chunk in text_chunks if not chunk.get("embedding_bits")
+        ]
 
+    # Scoring stage: one (N, D) matrix against the query — a single GEMV
+    # instead of N Python-level cosine calls. Rows with stored uint8 codes
+    # are scored from those (a quarter of the float32 bytes, reconstructed
+    # with one vectorized affine transform); float32 stays for legacy rows.
+    dim = len(query_embedding)
+    candidates: List[Dict[str, Any]] = []
+    vectors: List[Any] = []
+    q_candidates: List[Dict[str, Any]] = []
+    q_codes: List[np.ndarray] = []
+    q_scales: List[float] = []
+    q_zps: List[float] = []
+    # With the memmap sidecar enabled, its rows win over any per-row decode:
+    # one contiguous gather instead of N buffer/JSON conversions.
+    store = get_store()
+    store_rows: Dict[int, np.ndarray] = (
+        store.rows_for([chunk["id"] for chunk in text_chunks]) if store is not None else {}
+    )
     for chunk in text_chunks:
-        text_emb = parse_embedding(chunk.get("paired_text_embedding"))
+        store_vec = store_rows.get(chunk["id"])
+        if store_vec is not None:
+            candidates.append(chunk)
+            vectors.append(store_vec)
+            continue
+        raw_q = chunk.get("text_embedding_q")
+        if raw_q is not None and chunk.get("text_embedding_scale") is not None:
+            codes = np.frombuffer(raw_q, dtype=np.uint8)
+            if len(codes) != dim:
+                continue
+            q_candidates.append(chunk)
+            q_codes.append(codes)
+            q_scales.append(chunk["text_embedding_scale"])
+            q_zps.append(chunk["text_embedding_zp"])
+            continue
+        raw_f32 = chunk.get("paired_text_embedding_f32")
+        if raw_f32 is not None:
+            # Normalized float32 bytes stored at ingest: no JSON parsing
+            text_emb = np.frombuffer(raw_f32, dtype=np.float32)
+        else:
+            text_emb = parse_embedding(chunk.get("paired_text_embedding"))
         if text_emb is None:
             continue
-        if len(text_emb) != len(query_embedding):
+        if len(text_emb) != dim:
             continue  # Skip dimension mismatches
-        sim = cosine_similarity(query_embedding, text_emb)
-        scored.append({**chunk, "similarity": sim})
+        candidates.append(chunk)
+        vectors.append(text_emb)
+    if not candidates and not q_candidates:
+        return []
+
+    query = np.asarray(query_embedding, dtype=np.float32)
+    query /= np.linalg.norm(query) + 1e-12
 
-    scored.sort(key=lambda item: item["similarity"], reverse=True)
-    return scored[:top_k]
+    sim_blocks: List[np.ndarray] = []
+    if q_candidates:
+        qmat = np.stack(q_codes).astype(np.float32)
+        qmat *= np.asarray(q_scales, dtype=np.float32)[:, None]
+        qmat += np.asarray(q_zps, dtype=np.float32)[:, None]
+        sim_blocks.append(_rank_kernel(qmat, query))
+    if candidates:
+        mat = np.ascontiguousarray(vectors, dtype=np.float32)
+        sim_blocks.append(_rank_kernel(mat, query))
+    candidates = q_candidates + candidates
+    sims = np.concatenate(sim_blocks)
+
+    # O(N + k log k) top-k: partition out the k best, then sort only those
+    if len(sims) > top_k:
+        order = np.argpartition(-sims, top_k - 1)[:top_k]
+        order = order[np.argsort(-sims[order])]
+    else:
+        order = np.argsort(-sims)
+    return [{**candidates[i], "similarity": float(sims[i])} for i in order]
+
+
+def _as_int(value: Any) -> Optional[int]:
+    """Coerce an LLM-provided chunk id to int, or None when malformed."""
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return None
 
 
 def search_rag_with_images(query: str, top_k: int = 5, owner_user_id: Optional[int] = None) -> Dict[str, Any]:
     top_k = min(max(top_k, 1), Config.MAX_CONTEXT_CHUNKS)
-    query_embedding = text_model.encode(query).tolist()
+    query_embedding = _query_embedding(query).tolist()
 
     ranked_chunks = _rank_chunks(query_embedding, top_k, owner_user_id=owner_user_id)
     chunk_ids = [chunk["id"] for chunk in ranked_chunks]
-    images_by_chunk = fetch_images_for_text_chunks(chunk_ids)
-    doc_map = fetch_documents_by_ids((ch["document_id"] for ch in ranked_chunks), owner_user_id=owner_user_id)
+    document_ids = [chunk["document_id"] for chunk in ranked_chunks]
+    if ranked_chunks and "images" in ranked_chunks[0]:
+        # The fused pgvector query already returned each hit's images
+        images_by_chunk = {chunk["id"]: chunk.pop("images") or [] for chunk in ranked_chunks}
+        doc_map = fetch_documents_by_ids(document_ids, owner_user_id=owner_user_id)
+    else:
+        # Two independent round-trips; overlap them
+        images_future = _FETCH_POOL.submit(fetch_images_for_text_chunks, chunk_ids)
+        doc_map = fetch_documents_by_ids(document_ids, owner_user_id=owner_user_id)
+        images_by_chunk = images_future.result()
 
-    context_segments: List[Dict[str, Any]] = []
-    for order, chunk in enumerate(ranked_chunks, start=1):
-        document = doc_map.get(chunk["document_id"], {})
-        document_payload = {
+    # One payload per document, shared by every segment that references it
+    doc_payloads = {
+        document_id: {
             "id": document.get("id"),
             "filename": document.get("filename"),
             "url": f"/api/documents/{document.get('id')}/file" if document.get("id") else None,
         }
-        context_segments.append(
-            {
-                "order": order,
-                "chunk_id": chunk["id"],
-                "document_id": chunk["document_id"],
-                "page_number": chunk.get("page_number"),
-                "chunk_index": chunk.get("chunk_index"),
-                "content": chunk.get("content", ""),
-                "metadata": {
-                    **(chunk.get("metadata") or {}),
-                    "similarity": chunk["similarity"],
-                },
-                "images": images_by_chunk.get(chunk["id"], []),
+        for document_id, document in doc_map.items()
+    }
+    missing_doc_payload = {"id": None, "filename": None, "url": None}
+    context_segments: List[Dict[str, Any]] = [
+        {
+            "order": order,
+            "chunk_id": chunk["id"],
+            "document_id": chunk["document_id"],
+            "page_number": chunk.get("page_number"),
+            "chunk_index": chunk.get("chunk_index"),
+            "content": chunk.get("content", ""),
+            "metadata": {
+                **(chunk.get("metadata") or {}),
                 "similarity": chunk["similarity"],
-                "document": document_payload,
-            }
-        )
+            },
+            "images": images_by_chunk.get(chunk["id"], []),
+            "similarity": chunk["similarity"],
+            "document": doc_payloads.get(chunk["document_id"], missing_doc_payload),
+        }
+        for order, chunk in enumerate(ranked_chunks, start=1)
+    ]
 
-    llm_response = gemini_client.generate(query, context_segments)
+    # O(1) lookups for section building instead of scanning every segment
+    seg_by_id = {seg["chunk_id"]: seg for seg in context_segments}
+
+    llm_cache_key = hashlib.blake2b(
+        "{}|{}".format(query.strip(), ",".join(map(str, sorted(chunk_ids)))).encode("utf-8"),
+        digest_size=16,
+    ).digest()
+    with _llm_cache_lock:
+        llm_response = _LLM_CACHE.get(llm_cache_key)
+    if llm_response is None:
+        llm_response = gemini_client.generate(query, context_segments)
+        if chunk_ids and llm_response.get("source") != "fallback":
+            with _llm_cache_lock:
+                _LLM_CACHE[llm_cache_key] = llm_response
 
     sections_with_images: List[Dict[str, Any]] = []
     for section in llm_response.get("sections", []):
-        chunk_ids_in_section = []
-        for chunk_id in section.get("chunk_ids", []):
-            try:
-                chunk_ids_in_section.append(int(chunk_id))
-            except (ValueError, TypeError):
-                continue
-
-        section_images: List[Dict[str, Any]] = []
-        for cid in chunk_ids_in_section:
-            section_images.extend(images_by_chunk.get(cid, []))
-
+        # Dedupe while keeping the LLM's citation order, so a repeated id
+        # cannot attach the same images/documents twice.
+        chunk_ids_in_section = list(
+            dict.fromkeys(
+                cid
+                for cid in (_as_int(chunk_id) for chunk_id in section.get("chunk_ids", []))
+                if cid is not None
+            )
+        )
+        section_images: List[Dict[str, Any]] = [
+            image
+            for cid in chunk_ids_in_section
+            for image in images_by_chunk.get(cid, [])
+        ]
         sections_with_images.append(
             {
                 "title": section.get("title"),
@@ -131,8 +373,10 @@ def search_rag_with_images(query: str, top_k: int = 5, owner_user_id: Optional[i
                         "url": ctx["document"].get("url"),
                         "page_number": ctx.get("page_number"),
                     }
-                    for ctx in context_segments
-                    if ctx["chunk_id"] in chunk_ids_in_section and ctx.get("document")
+                    for ctx in (
+                        seg_by_id[cid] for cid in chunk_ids_in_section if cid in seg_by_id
+                    )
+                    if ctx.get("document")
                 ],
             }
         )
@@ -142,6 +386,8 @@ def search_rag_with_images(query: str, top_k: int = 5, owner_user_id: Optional[i
         "sections": sections_with_images,
         "context": context_segments,
         "chunks_used": chunk_ids,
+        "query": query,
+        "top_k": top_k,
         "model": Config.GEMINI_MODEL if gemini_client.enabled else "retriever_only",
         "embedding_model": Config.TEXT_EMBEDDING_MODEL,
         "embedding_dim": Config.TEXT_EMBEDDING_DIM,
@@ -0,0 +1,138 @@
+"""Dense memmap sidecar for text embeddings.
+
+The JSONB fallback ranker normally decodes one embedding per candidate row
+fetched from Postgres. This module keeps the same vectors in a flat fp32
+file (``embeddings.f32``) addressed directly by chunk id, plus a byte
+bitmap of live rows, so ranking can gather an (N, D) matrix with a single
+fancy index into the page cache instead of N per-row decodes.
+
+The store is a rebuildable cache, not a source of truth: Postgres remains
+authoritative, the file is repopulated from it when missing, and ranking
+only ever consults the store for ids it just fetched from Postgres, so a
+stale row can never surface a deleted chunk. Disabled unless
+``USE_VECTOR_STORE`` is set.
+"""
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from ..config import Config
+
+# Rows are allocated in blocks so every insert does not grow the file.
+_GROWTH_ROWS = 4096
+
+
+class VectorStore:
+    """fp32 memmap of shape (capacity, dim) indexed by chunk id."""
+
+    def __init__(self, directory: str, dim: int):
+        self.dim = dim
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._mat_path = os.path.join(directory, "embeddings.f32")
+        self._live_path = os.path.join(directory, "live.u8")
+        self.created = not os.path.exists(self._mat_path)
+        rows = _GROWTH_ROWS
+        if not self.created:
+            rows = max(os.path.getsize(self._mat_path) // (4 * dim), _GROWTH_ROWS)
+        self._open(rows)
+
+    def _open(self, rows: int) -> None:
+        # Extending the files before mapping keeps mode="r+" valid for both
+        # the fresh-file and grow cases.
+        for path, row_bytes in ((self._mat_path, 4 * self.dim), (self._live_path, 1)):
+            with open(path, "ab") as f:
+                if f.tell() < rows * row_bytes:
+                    f.truncate(rows * row_bytes)
+        self._rows = rows
+        self._mat = np.memmap(self._mat_path, dtype=np.float32, mode="r+", shape=(rows, self.dim))
+        self._live = np.memmap(self._live_path, dtype=np.uint8, mode="r+", shape=(rows,))
+
+    def _ensure_capacity(self, chunk_id: int) -> None:
+        if chunk_id >= self._rows:
+            needed = chunk_id + 1
+            rows = self._rows
+            while rows < needed:
+                rows += _GROWTH_ROWS
+            self._open(rows)
+
+    def add_batch(self, chunk_ids: Sequence[int], embeddings: Sequence[Sequence[float]]) -> None:
+        """Write embeddings at their chunk-id rows and mark them live."""
+        if not chunk_ids:
+            return
+        with self._lock:
+            self._ensure_capacity(max(chunk_ids))
+            for chunk_id, embedding in zip(chunk_ids, embeddings):
+                vector = np.asarray(embedding, dtype=np.float32)
+                if vector.shape != (self.dim,):
+                    continue
+                self._mat[chunk_id] = vector
+                self._live[chunk_id] = 1
+            self._mat.flush()
+            self._live.flush()
+
+    def discard(self, chunk_ids: Iterable[int]) -> None:
+        """Mark rows dead (after chunk deletion); bytes stay until reused."""
+        with self._lock:
+            for chunk_id in chunk_ids:
+                if 0 <= chunk_id < self._rows:
+                    self._live[chunk_id] = 0
+            self._live.flush()
+
+    def rows_for(self, chunk_ids: Sequence[int]) -> Dict[int, np.ndarray]:
+        """Gather live rows for the given ids in one fancy index."""
+        with self._lock:
+            valid = [
+                chunk_id
+                for chunk_id in chunk_ids
+                if isinstance(chunk_id, int) and 0 <= chunk_id < self._rows and self._live[chunk_id]
+            ]
+            if not valid:
+                return {}
+            gathered = np.array(self._mat[valid], dtype=np.float32)
+        return {chunk_id: gathered[i] for i, chunk_id in enumerate(valid)}
+
+    def rebuild(self) -> None:
+        """Repopulate the file from Postgres (fresh file or lost volume)."""
+        from ..repository.rag_repository import fetch_text_chunks
+
+        chunks = fetch_text_chunks(include_embedding=True)
+        chunk_ids: List[int] = []
+        embeddings: List[np.ndarray] = []
+        for chunk in chunks:
+            raw_f32 = chunk.get("paired_text_embedding_f32")
+            if raw_f32 is not None:
+                vector = np.frombuffer(raw_f32, dtype=np.float32)
+            else:
+                stored = chunk.get("paired_text_embedding")
+                if stored is None:
+                    continue
+                vector = np.asarray(stored, dtype=np.float32)
+            if vector.shape != (self.dim,):
+                continue
+            chunk_ids.append(chunk["id"])
+            embeddings.append(vector)
+        self.add_batch(chunk_ids, embeddings)
+
+
+_store: Optional[VectorStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> Optional[VectorStore]:
+    """Return the process-wide store, or None when disabled."""
+    if not Config.USE_VECTOR_STORE:
+        return None
+    global _store
+    with _store_lock:
+        if _store is None:
+            store = VectorStore(Config.VECTOR_STORE_DIR, Config.TEXT_EMBEDDING_DIM)
+            if store.created:
+                try:
+                    store.rebuild()
+                except Exception as exc:
+                    print(f"⚠️ Vector store rebuild failed (will fill on insert): {exc}")
+            _store = store
+    return _store
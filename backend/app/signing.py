@@ -0,0 +1,50 @@
+import base64
+import hashlib
+import hmac
+import json
+import struct
+import time
+from typing import Any, Dict, Optional
+
+from .config import Config
+
+# Truncated HMAC-SHA256 tag. 128 bits is ample for token forgery resistance
+# while keeping tokens short.
+_SIG_BYTES = 16
+
+
+def _b64u_encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64u_decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _signature(body: bytes) -> bytes:
+    return hmac.new(Config.AUTH_SECRET.encode(), body, hashlib.sha256).digest()[:_SIG_BYTES]
+
+
+def sign(payload: Dict[str, Any]) -> str:
+    """Serialize and sign a payload into a compact url-safe token."""
+    body = (
+        _b64u_encode(json.dumps(payload, separators=(",", ":")).encode())
+        + "."
+        + _b64u_encode(struct.pack(">Q", int(time.time())))
+    )
+    return body + "." + _b64u_encode(_signature(body.encode()))
+
+
+def unsign(token: str, max_age: int) -> Optional[Dict[str, Any]]:
+    """Verify a token's signature and age, returning its payload or None."""
+    try:
+        payload_b64, ts_b64, sig_b64 = token.split(".")
+        body = f"{payload_b64}.{ts_b64}".encode()
+        if not hmac.compare_digest(_signature(body), _b64u_decode(sig_b64)):
+            return None
+        issued_at = struct.unpack(">Q", _b64u_decode(ts_b64))[0]
+        if time.time() - issued_at > max_age:
+            return None
+        return json.loads(_b64u_decode(payload_b64))
+    except Exception:
+        return None
@@ -1,49 +1,89 @@
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import closing
 
 from .config import Config
 from .db import connect_db
-from .services.gemini import gemini_client
-from .services.embedding import text_model, clip_model
 
 logger = logging.getLogger(__name__)
 
 
+# Environment probes are evaluated once at import: none of these values can
+# change mid-process, so repeated os.getenv walks buy nothing.
+_CI_INDICATORS = (
+    "CI",
+    "GITHUB_ACTIONS",
+    "TRAVIS",
+    "JENKINS_URL",
+    "GITLAB_CI",
+    "CIRCLECI",
+    "APPVEYOR",
+    "TEAMCITY_VERSION",
+)
+_IS_CI = any(os.getenv(indicator) for indicator in _CI_INDICATORS)
+_SKIP_STARTUP = os.getenv("SKIP_STARTUP_CHECKS") in ("1", "true", "True")
+
+
 def _is_ci_environment() -> bool:
-    ci_indicators = [
-        "CI",
-        "GITHUB_ACTIONS",
-        "TRAVIS",
-        "JENKINS_URL",
-        "GITLAB_CI",
-        "CIRCLECI",
-        "APPVEYOR",
-        "TEAMCITY_VERSION",
-    ]
-    return any(os.getenv(indicator) for indicator in ci_indicators)
+    return _IS_CI
 
 
-def _check_database() -> bool:
-    """Verify database connectivity."""
+def _check_db_and_pgvector() -> "tuple[bool, bool]":
+    """Verify database connectivity and pgvector on a single connection.
+
+    Both probes are trivial queries, so sharing one connection avoids
+    paying the TCP/auth handshake twice at boot. Returns (db_ok,
+    pgvector_ok); pgvector_ok is True when the check is disabled.
+    """
     try:
         with closing(connect_db()) as conn:
             with conn.cursor() as cur:
                 cur.execute("SELECT 1;")
-        logger.info(
-            "Database connection successful (host=%s db=%s user=%s)",
-            Config.DB_HOST,
-            Config.DB_NAME,
-            Config.DB_USER,
-        )
-        return True
+                logger.info(
+                    "Database connection successful (host=%s db=%s user=%s)",
+                    Config.DB_HOST,
+                    Config.DB_NAME,
+                    Config.DB_USER,
+                )
+                if not Config.USE_PGVECTOR:
+                    logger.info("pgvector is disabled, skipping check")
+                    return True, True
+                cur.execute("SELECT * FROM pg_extension WHERE extname = 'vector';")
+                if cur.fetchone() is None:
+                    logger.warning(
+                        "pgvector extension not found in database. "
+                        "Run migration 003_high_dim_embeddings.sql to install it."
+                    )
+                    return True, False
+                # Without an HNSW index every vector query degrades to an
+                # exact O(N) scan, so its absence is worth flagging early.
+                cur.execute(
+                    "SELECT indexname FROM pg_indexes "
+                    "WHERE tablename = 'rag_chunks' AND indexdef ILIKE '%%USING hnsw%%';"
+                )
+                if cur.fetchone() is None:
+                    logger.warning(
+                        "No HNSW index found on rag_chunks; vector search will "
+                        "fall back to exact scans. Run migration "
+                        "007_partial_text_vector_index.sql to create it."
+                    )
+        logger.info("pgvector extension is available")
+        return True, True
     except Exception as exc:
         logger.exception("Database connection failed: %s", exc)
-        return False
+        return False, False
+
+
+def _check_database() -> bool:
+    """Verify database connectivity."""
+    return _check_db_and_pgvector()[0]
 
 
 def _check_gemini() -> bool:
     """Ensure Gemini API key is configured and client is enabled."""
+    from .services.gemini import gemini_client
+
     if not Config.GEMINI_API_KEY:
         logger.error("GEMINI_API_KEY / GOOGLE_API_KEY is not set.")
         return False
@@ -63,9 +103,11 @@ def _check_gemini() -> bool:
 def _check_embedding_models() -> bool:
     """Verify embedding models load correctly and return expected dimensions."""
     try:
+        from .services.embedding import _get_clip, _get_text_model
+
         # Test text model
         test_text = "Test embedding"
-        text_embedding = text_model.encode(test_text).tolist()
+        text_embedding = _get_text_model().encode(test_text).tolist()
         if len(text_embedding) != Config.TEXT_EMBEDDING_DIM:
             logger.error(
                 f"Text embedding dimension mismatch: expected {Config.TEXT_EMBEDDING_DIM}, "
@@ -77,8 +119,19 @@ def _check_embedding_models() -> bool:
             f"Text embedding model ready: {Config.TEXT_EMBEDDING_MODEL} "
             f"({Config.TEXT_EMBEDDING_DIM} dimensions)"
         )
-        
+
+        # A second encode under inference_mode pays any lazy tracing /
+        # kernel-selection cost here instead of on the first real request.
+        try:
+            import torch
+
+            with torch.inference_mode():
+                _get_text_model().encode(test_text)
+        except ImportError:
+            pass
+
         # Test image model (check if it loads, full test requires an image)
+        clip_model, _ = _get_clip()
         if clip_model is None:
             logger.error("Image embedding model failed to load")
             return False
@@ -96,26 +149,7 @@ def _check_embedding_models() -> bool:
 
 def _check_pgvector() -> bool:
     """Check if pgvector extension is available (if enabled)."""
-    if not Config.USE_PGVECTOR:
-        logger.info("pgvector is disabled, skipping check")
-        return True
-    
-    try:
-        with closing(connect_db()) as conn:
-            with conn.cursor() as cur:
-                cur.execute("SELECT * FROM pg_extension WHERE extname = 'vector';")
-                result = cur.fetchone()
-                if result is None:
-                    logger.warning(
-                        "pgvector extension not found in database. "
-                        "Run migration 003_high_dim_embeddings.sql to install it."
-                    )
-                    return False
-        logger.info("pgvector extension is available")
-        return True
-    except Exception as exc:
-        logger.warning(f"pgvector check failed (may not be installed): {exc}")
-        return False
+    return _check_db_and_pgvector()[1]
 
 
 def run_startup_checks() -> None:
@@ -125,7 +159,7 @@ def run_startup_checks() -> None:
     
     Automatically skips checks in CI environments where dependencies may not be available.
     """
-    if os.getenv("SKIP_STARTUP_CHECKS") in ("1", "true", "True"):
+    if _SKIP_STARTUP:
         logger.info("Startup checks skipped by configuration.")
         return
     
@@ -140,14 +174,19 @@ def run_startup_checks() -> None:
         return
     
     logger.info("Running startup checks...")
-    checks = {
-        "database": _check_database(),
-        "gemini": _check_gemini(),
-        "embedding_models": _check_embedding_models(),
-    }
-    
+    # Model warm-up is the slowest check (a full forward pass), so run it in
+    # the background while the DB and Gemini probes execute; join before
+    # declaring the process ready.
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        warmup_future = executor.submit(_check_embedding_models)
+        db_ok, pgvector_ok = _check_db_and_pgvector()
+        checks = {
+            "database": db_ok,
+            "gemini": _check_gemini(),
+            "embedding_models": warmup_future.result(),
+        }
+
     # pgvector check is non-critical (falls back to JSONB)
-    pgvector_ok = _check_pgvector()
     if not pgvector_ok:
         logger.warning(
             "pgvector not available. Vector search will fall back to JSONB. "
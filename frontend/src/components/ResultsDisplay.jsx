@@ -36,12 +36,13 @@ function ResultsDisplay({ result }) {
     return null
   }
 
-  const decodeBase64Image = (base64) => {
-    try {
-      return `data:image/png;base64,${base64}`
-    } catch (e) {
-      return null
-    }
+  const decodeBase64Image = (image) => {
+    if (!image?.image_base64) return null
+    // The backend stores the original JPEG/PNG/GIF/WEBP bytes (or a JPEG
+    // transcode) and records the format in metadata.image_format; rows
+    // ingested before that field existed are PNG re-encodes.
+    const format = (image.metadata?.image_format || 'PNG').toLowerCase()
+    return `data:image/${format};base64,${image.image_base64}`
   }
 
   const hasSections = result.sections && result.sections.length > 0
@@ -74,7 +75,7 @@ function ResultsDisplay({ result }) {
   }
 
   const openImageViewer = (image) => {
-    const decoded = decodeBase64Image(image.image_base64)
+    const decoded = decodeBase64Image(image)
     if (!decoded) return
     setActiveImage({
       title: image.metadata?.filename || `Image from page ${image.page_number}`,
@@ -195,7 +196,7 @@ function ResultsDisplay({ result }) {
                       aria-label={`Open image from page ${image.page_number}`}
                     >
                       <img
-                        src={decodeBase64Image(image.image_base64)}
+                        src={decodeBase64Image(image)}
                         alt={`Page ${image.page_number}`}
                       />
                       <div className="image-card-footer">
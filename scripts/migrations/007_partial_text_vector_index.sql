@@ -0,0 +1,13 @@
+-- Partial ANN index for the text-chunk vector search path
+-- The HNSW indexes from 003 cover every row in rag_chunks; the search query
+-- only ever scans text chunks with a populated embedding, so a partial index
+-- keeps the graph smaller, cheaper to maintain, and faster to traverse.
+
+CREATE INDEX IF NOT EXISTS idx_rag_chunks_text_vector_hnsw_partial
+    ON rag_chunks
+    USING hnsw (text_embedding_vector vector_cosine_ops)
+    WITH (m = 16, ef_construction = 64)
+    WHERE chunk_type = 'text' AND text_embedding_vector IS NOT NULL;
+
+-- The IVFFlat index from 003 is superseded by HNSW for this workload
+DROP INDEX IF EXISTS idx_rag_chunks_text_vector_ivfflat;
@@ -0,0 +1,6 @@
+-- Composite index for owner-scoped document lookups
+-- fetch_document_by_id filters on (owner_user_id, id), so non-owners are
+-- rejected by a single index probe instead of a heap fetch plus filter.
+
+CREATE INDEX IF NOT EXISTS idx_rag_documents_owner_id
+    ON rag_documents (owner_user_id, id);
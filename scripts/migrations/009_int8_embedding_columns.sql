@@ -0,0 +1,11 @@
+-- int8-quantized embedding columns (see services/quantize.py)
+-- Stored alongside the full vectors: a quarter of the float32 bytes, used
+-- for cheap similarity scoring without touching the JSONB copies.
+
+ALTER TABLE rag_chunks
+    ADD COLUMN IF NOT EXISTS text_embedding_q BYTEA,
+    ADD COLUMN IF NOT EXISTS text_embedding_scale REAL,
+    ADD COLUMN IF NOT EXISTS text_embedding_zp REAL,
+    ADD COLUMN IF NOT EXISTS image_embedding_q BYTEA,
+    ADD COLUMN IF NOT EXISTS image_embedding_scale REAL,
+    ADD COLUMN IF NOT EXISTS image_embedding_zp REAL;
@@ -0,0 +1,6 @@
+-- 1-bit sign-quantized embedding for cheap Hamming prefiltering
+-- 1024 dims pack into 128 bytes; the fallback ranker scores these before
+-- exact cosine re-ranking (see services/quantize.py binarize()).
+
+ALTER TABLE rag_chunks
+    ADD COLUMN IF NOT EXISTS embedding_bits BYTEA;
@@ -0,0 +1,3 @@
+-- Raw float32 bytes of the L2-normalized text embedding, so the JSONB
+-- fallback ranker can np.frombuffer instead of parsing a JSON array.
+ALTER TABLE rag_chunks ADD COLUMN IF NOT EXISTS paired_text_embedding_f32 BYTEA;
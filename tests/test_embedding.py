@@ -9,7 +9,11 @@ from unittest.mock import Mock, patch, MagicMock
 # Set TESTING flag before any imports
 os.environ.setdefault("TESTING", "true")
 
-from app.services.embedding import embed_text, embed_image_from_stream
+from app.services.embedding import (
+    embed_text,
+    embed_image_from_stream,
+    _build_gpu_preprocess,
+)
 from app.config import Config
 
 
@@ -76,13 +80,14 @@ class TestEmbedImageFromStream:
     ):
         """Test successful image embedding."""
         # Setup
+        pytest.importorskip("torch")
         from PIL import Image
         mock_conn = Mock()
         mock_img = Image.new('RGB', (100, 100), color='red')
         mock_decode.return_value = mock_img
-        
+
         mock_processor.return_value = {'pixel_values': Mock()}
-        mock_output = Mock()
+        mock_output = MagicMock()
         mock_output[0].cpu.return_value.numpy.return_value.tolist.return_value = [0.1] * Config.IMAGE_EMBEDDING_DIM
         mock_model.get_image_features.return_value = mock_output
 
@@ -103,6 +108,30 @@ class TestEmbedImageFromStream:
         mock_decode.assert_called_once()
         mock_insert_chunk.assert_called_once()
 
+    def test_gpu_preprocess_mixed_size_batch(self):
+        """Test that differently-sized images in one batch preprocess cleanly.
+
+        Geometry (Resize/CenterCrop) must run per image before stacking;
+        stacking the raw tensors raises for any mixed-size batch.
+        """
+        torch = pytest.importorskip("torch")
+        pytest.importorskip("torchvision")
+
+        image_processor = Mock()
+        image_processor.size = {"shortest_edge": 32}
+        image_processor.crop_size = {"height": 32, "width": 32}
+        image_processor.image_mean = [0.5, 0.5, 0.5]
+        image_processor.image_std = [0.5, 0.5, 0.5]
+
+        geometry, batched = _build_gpu_preprocess(image_processor)
+        images = [
+            torch.zeros((3, 64, 48), dtype=torch.uint8),
+            torch.zeros((3, 100, 120), dtype=torch.uint8),
+        ]
+        pixel_values = batched(torch.stack([geometry(image) for image in images]))
+        assert pixel_values.shape == (2, 3, 32, 32)
+        assert pixel_values.dtype == torch.float32
+
     @patch('app.services.embedding._decode_pdf_image_stream')
     def test_embed_image_from_stream_empty_data(self, mock_decode):
         """Test that empty stream data returns None."""
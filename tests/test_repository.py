@@ -0,0 +1,100 @@
+"""
+Tests for repository COPY bulk-load encoding.
+"""
+import os
+import numpy as np
+from unittest.mock import Mock
+
+# Set TESTING flag before any imports
+os.environ.setdefault("TESTING", "true")
+
+from app.repository.rag_repository import _copy_field, _copy_chunks
+
+
+class TestCopyField:
+    """Tests for text-format COPY field rendering."""
+
+    def test_none_is_null_marker(self):
+        """Test that None renders as the COPY NULL marker."""
+        assert _copy_field(None) == r"\N"
+
+    def test_bytes_hex_encoded(self):
+        """Test that bytes render as a bytea hex literal."""
+        assert _copy_field(b"\x01\xff") == r"\\x01ff"
+
+    def test_memoryview_hex_encoded(self):
+        """Test that memoryviews render like bytes."""
+        assert _copy_field(memoryview(b"\x00\x10")) == r"\\x0010"
+
+    def test_backslash_and_whitespace_escaped(self):
+        """Test backslash, tab, newline and CR escaping."""
+        assert _copy_field("a\\b\tc\nd\re") == "a\\\\b\\tc\\nd\\re"
+
+    def test_plain_values_pass_through(self):
+        """Test that unremarkable values stringify unchanged."""
+        assert _copy_field(7) == "7"
+        assert _copy_field("plain") == "plain"
+
+
+class TestCopyChunks:
+    """Tests for the COPY bulk loader."""
+
+    def test_rows_match_declared_columns(self):
+        """Test id pre-assignment, column ordering and field encoding."""
+        rows = [
+            {
+                "document_id": 1,
+                "chunk_type": "text",
+                "page_number": 2,
+                "chunk_index": 3,
+                "content": "tab\there\nand newline",
+                "text_embedding": [0.1, 0.2, 0.3],
+                "image_embedding": None,
+                "image_base64": None,
+                "metadata": {"k": "v"},
+                "linked_chunk_id": None,
+            },
+            {
+                "document_id": 1,
+                "chunk_type": "image",
+                "page_number": None,
+                "chunk_index": None,
+                "content": None,
+                "text_embedding": None,
+                "image_embedding": [1.0, 0.0],
+                "image_base64": "abc",
+                "metadata": {},
+                "linked_chunk_id": 101,
+            },
+        ]
+        cur = Mock()
+        cur.fetchall.return_value = [(101,), (102,)]
+
+        chunk_ids = _copy_chunks(cur, rows)
+
+        # Ids come from the table's sequence, drawn once up front
+        assert chunk_ids == [101, 102]
+        assert "pg_get_serial_sequence" in cur.execute.call_args[0][0]
+
+        copy_sql, buffer = cur.copy_expert.call_args[0]
+        columns = copy_sql[copy_sql.index("(") + 1 : copy_sql.index(")")].split(", ")
+        assert columns[0] == "id"
+
+        # Every record carries exactly one field per declared column;
+        # embedded tabs/newlines are escaped so they cannot split records
+        lines = buffer.getvalue().splitlines()
+        assert len(lines) == len(rows)
+        first, second = (line.split("\t") for line in lines)
+        assert len(first) == len(columns)
+        assert len(second) == len(columns)
+
+        assert first[0] == "101"
+        assert second[0] == "102"
+        assert first[columns.index("content")] == "tab\\there\\nand newline"
+        assert second[columns.index("content")] == r"\N"
+        assert second[columns.index("linked_chunk_id")] == "101"
+
+        # Normalized-at-insert float32 bytes land as a bytea hex literal
+        expected_f32 = np.asarray([0.1, 0.2, 0.3], dtype=np.float32).tobytes().hex()
+        assert first[columns.index("paired_text_embedding_f32")] == r"\\x" + expected_f32
+        assert second[columns.index("paired_text_embedding_f32")] == r"\N"
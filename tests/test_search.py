@@ -2,6 +2,7 @@
 Tests for search service.
 """
 import os
+import numpy as np
 import pytest
 from unittest.mock import Mock, patch, MagicMock
 
@@ -13,6 +14,7 @@ from app.services.search import (
     cosine_similarity,
     parse_embedding,
     _rank_chunks,
+    _rank_kernel,
 )
 
 
@@ -54,13 +56,15 @@ class TestParseEmbedding:
         """Test parsing a list embedding."""
         emb = [1.0, 2.0, 3.0]
         result = parse_embedding(emb)
-        assert result == emb
+        assert isinstance(result, np.ndarray)
+        assert result.tolist() == emb
 
     def test_parse_embedding_string(self):
         """Test parsing a string representation of embedding."""
         emb = "[1.0, 2.0, 3.0]"
         result = parse_embedding(emb)
-        assert result == [1.0, 2.0, 3.0]
+        assert isinstance(result, np.ndarray)
+        assert result.tolist() == [1.0, 2.0, 3.0]
 
     def test_parse_embedding_none(self):
         """Test parsing None returns None."""
@@ -73,6 +77,33 @@ class TestParseEmbedding:
         assert result is None
 
 
+class TestRankKernel:
+    """Tests for the fallback ranking kernel (numba or numpy)."""
+
+    def test_rank_kernel_matches_cosine(self):
+        """Whichever implementation is active must match per-row cosine."""
+        mat = np.array(
+            [[1.0, 2.0, 3.0], [0.0, 1.0, 0.0], [4.0, 5.0, 6.0]],
+            dtype=np.float32,
+        )
+        query = np.array([1.0, 0.0, 0.0], dtype=np.float32)  # unit norm
+        result = _rank_kernel(mat, query)
+        expected = [cosine_similarity(row.tolist(), query.tolist()) for row in mat]
+        assert np.allclose(result, expected, atol=1e-5)
+
+    def test_rank_kernel_jitted(self):
+        """When numba is installed, the jitted kernel compiles and runs."""
+        pytest.importorskip("numba")
+        # The module-level kernel must be the numba dispatcher, not the
+        # numpy fallback
+        assert hasattr(_rank_kernel, "py_func")
+        mat = (np.arange(12, dtype=np.float32).reshape(3, 4) + 1.0)
+        query = np.zeros(4, dtype=np.float32)
+        query[0] = 1.0
+        expected = (mat / np.linalg.norm(mat, axis=1, keepdims=True)) @ query
+        assert np.allclose(_rank_kernel(mat, query), expected, atol=1e-5)
+
+
 class TestSearchRAGWithImages:
     """Tests for RAG search with images."""
 